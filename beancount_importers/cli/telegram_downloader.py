@@ -4,16 +4,19 @@ This module provides a CLI tool to download transaction messages from Telegram
 and format them as CSV files compatible with the Telegram importer.
 """
 
+import asyncio
 import csv
+import re
 import sys
 from argparse import Action, ArgumentError, ArgumentParser, ArgumentTypeError
-from collections.abc import Sequence
-from datetime import date, datetime
-from fnmatch import fnmatch
-from os import remove
-from os.path import expanduser, isfile
+from collections.abc import Iterable, Sequence
+from datetime import datetime
+from fnmatch import translate
+from io import TextIOWrapper
+from os import SEEK_END, remove, scandir
+from os.path import dirname, expanduser, isfile, normcase, split, splitext
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
 
 from dateutil import parser
 from telethon.sync import TelegramClient
@@ -24,6 +27,36 @@ DESCRIPTION = "Download Telegram chat messages and format them for Beancount imp
 DOCS_URL = "https://github.com/c-vigo/beancount-importers"
 
 
+class Entry(NamedTuple):
+    """Row of the CSV files written by the downloader."""
+
+    id: str
+    sender: str
+    message_date: str
+    transaction_date: str
+    account: str
+    payee: str
+    description: str
+    amount: str
+    currency: str
+    tag: str
+
+
+# Columns of the CSV files written by the downloader
+FIELDNAMES = Entry._fields
+
+# Date formats tried before falling back to dateutil; they must parse to the
+# same date dateutil would return
+TRANSACTION_DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d")
+ATTACHMENT_DATE_FORMATS = {8: "%Y%m%d", 10: "%Y-%m-%d"}
+
+# Bytes read from the end of a CSV file to find its last row
+TAIL_SIZE = 4096
+
+# Characters that force a CSV field to be quoted
+NEEDS_QUOTING = re.compile(r'["\r\n]')
+
+
 class AttachmentPattern:
     """Pattern for matching and processing Telegram attachments."""
 
@@ -49,6 +82,18 @@ class AttachmentPattern:
         self.skip_init = skip_init
         self.skip_end = skip_end
         self.name = name
+        self.regex = re.compile(translate(normcase(pattern)))
+
+    def matches(self, filename: str) -> bool:
+        """Check whether a filename matches the pattern, like fnmatch.
+
+        Args:
+            filename: Attachment filename
+
+        Returns:
+            True if the filename matches the pattern
+        """
+        return self.regex.match(normcase(filename)) is not None
 
     def __str__(self) -> str:
         """Return string representation."""
@@ -124,6 +169,251 @@ class ParseDict(Action):
         setattr(namespace, self.dest, result)
 
 
+class TransactionWriter:
+    """Append parsed transactions to their CSV files through cached handles.
+
+    Each destination file is opened once with a large buffer and kept open until
+    the writer is closed, so consecutive rows do not pay for open/close cycles.
+    Rows are written as pre-formatted lines; only rows with values that need
+    quoting go through the csv module, so the output matches ``csv.writer``.
+    """
+
+    BUFFER_SIZE = 1 << 20
+
+    def __init__(self, fieldnames: Sequence[str] = FIELDNAMES) -> None:
+        """Initialize transaction writer.
+
+        Args:
+            fieldnames: CSV column names
+        """
+        self.fieldnames = fieldnames
+        self._files: dict[str, TextIOWrapper] = {}
+        self._writers: dict[str, Any] = {}
+
+    def __enter__(self) -> "TransactionWriter":
+        """Enter the runtime context."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Close all open files when leaving the runtime context."""
+        self.close()
+
+    def add(self, filename: str, entry: Sequence[str]) -> None:
+        """Append an entry to the given CSV file.
+
+        Args:
+            filename: Destination CSV file
+            entry: Row to append, with values in column order
+        """
+        f = self._files.get(filename)
+        if f is None:
+            f = self._open(filename)
+        line = ";".join(entry)
+        if line.count(";") == len(entry) - 1 and not NEEDS_QUOTING.search(line):
+            f.write(line + "\r\n")
+        else:
+            self._writers[filename].writerow(entry)
+
+    def close(self) -> None:
+        """Flush and close all open files."""
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+        self._writers.clear()
+
+    def _open(self, filename: str) -> TextIOWrapper:
+        """Open a CSV file for appending, writing the header if it is new."""
+        new_file = not isfile(filename)
+        if new_file:
+            print(f"Creating file {filename}")
+        f = open(
+            filename,
+            "w" if new_file else "a",
+            buffering=self.BUFFER_SIZE,
+            encoding="UTF-8",
+            newline="",
+        )
+        writer = csv.writer(f, delimiter=";")
+        if new_file:
+            writer.writerow(self.fieldnames)
+        self._files[filename] = f
+        self._writers[filename] = writer
+        return f
+
+
+class AttachmentDownloader:
+    """Download message attachments concurrently.
+
+    Downloads are queued and run in batches on the client's event loop, with at
+    most ``max_parallel`` transfers in flight. Each destination directory is
+    listed once; queued destinations are added to that listing, so duplicate
+    names are detected without a stat per candidate, even before files exist.
+    """
+
+    def __init__(
+        self, client: Any, max_parallel: int = 8, batch_size: int = 32
+    ) -> None:
+        """Initialize attachment downloader.
+
+        Args:
+            client: Connected Telegram client
+            max_parallel: Maximum number of simultaneous downloads
+            batch_size: Number of queued downloads that triggers a flush
+        """
+        self.client = client
+        self.max_parallel = max_parallel
+        self.batch_size = batch_size
+        self._jobs: list[tuple[Any, str]] = []
+        self._listings: dict[str, set[str]] = {}
+
+    def __enter__(self) -> "AttachmentDownloader":
+        """Enter the runtime context."""
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *exc_info: object) -> None:
+        """Download the remaining attachments, also when leaving on an error.
+
+        Transactions of later messages may already be written, and the next run
+        resumes after them, so queued attachments would otherwise be lost. On an
+        interrupt (KeyboardInterrupt, SystemExit) no new downloads are started.
+        """
+        if exc_type is None or issubclass(exc_type, Exception):
+            self.flush()
+
+    def is_taken(self, filename: str) -> bool:
+        """Check whether a destination exists or is reserved by a queued download.
+
+        Args:
+            filename: Destination file
+
+        Returns:
+            True if the destination cannot be used
+        """
+        directory, name = split(filename)
+        return name in self._listing(directory)
+
+    def unique_name(self, filename: str) -> str:
+        """Find a free destination, appending _2, _3, ... to taken names.
+
+        Args:
+            filename: Preferred destination file
+
+        Returns:
+            The preferred destination, or the first free numbered variant
+        """
+        if not self.is_taken(filename):
+            return filename
+        root, extension = splitext(filename)
+        index = 2
+        while self.is_taken(f"{root}_{index}{extension}"):
+            index += 1
+        return f"{root}_{index}{extension}"
+
+    def add(self, msg: Any, filename: str) -> None:
+        """Queue the attachment of a message for download.
+
+        Args:
+            msg: Telegram message with a document
+            filename: Destination file
+        """
+        self._jobs.append((msg, filename))
+        directory, name = split(filename)
+        self._listing(directory).add(name)
+        if len(self._jobs) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Download all queued attachments.
+
+        Local file errors are reported and skipped; any other error (e.g. a
+        Telegram RPC error) is raised once the whole batch has finished.
+        """
+        if not self._jobs:
+            return
+        jobs = self._jobs
+        self._jobs = []
+        results = self.client.loop.run_until_complete(self._download_all(jobs))
+        error: BaseException | None = None
+        for (_, filename), result in zip(jobs, results, strict=True):
+            if isinstance(result, OSError):
+                print(f"Warning: Failed to download {filename}: {result}")
+            elif isinstance(result, BaseException):
+                error = error or result
+            else:
+                print(f"File downloaded: {result}")
+        if error is not None:
+            raise error
+
+    def _listing(self, directory: str) -> set[str]:
+        """Return the cached file names of a directory, listing it on first use."""
+        listing = self._listings.get(directory)
+        if listing is None:
+            try:
+                with scandir(directory or ".") as entries:
+                    listing = {entry.name for entry in entries}
+            except FileNotFoundError:
+                listing = set()
+            self._listings[directory] = listing
+        return listing
+
+    async def _download_all(self, jobs: list[tuple[Any, str]]) -> list[Any]:
+        """Run downloads on the event loop, bounded by max_parallel."""
+        semaphore = asyncio.Semaphore(self.max_parallel)
+
+        async def download(msg: Any, filename: str) -> Any:
+            async with semaphore:
+                return await self.client.download_media(message=msg, file=filename)
+
+        return await asyncio.gather(
+            *(download(msg, filename) for msg, filename in jobs),
+            return_exceptions=True,
+        )
+
+
+def parse_transaction_date(text: str) -> str:
+    """Parse the date field of a transaction message.
+
+    Args:
+        text: Date field of the message
+
+    Returns:
+        Date in YYYY-MM-DD format
+
+    Raises:
+        ValueError: If the date cannot be parsed
+    """
+    text = text.strip()
+    for fmt in TRANSACTION_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    parsed: datetime = parser.parse(text)
+    return parsed.strftime("%Y-%m-%d")
+
+
+def parse_attachment_date(text: str) -> str:
+    """Parse the ISO date embedded in an attachment filename.
+
+    Args:
+        text: Date part of the filename
+
+    Returns:
+        Date in YYYY-MM-DD format
+
+    Raises:
+        ValueError: If the date cannot be parsed
+    """
+    fmt = ATTACHMENT_DATE_FORMATS.get(len(text))
+    if fmt is not None:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    parsed: datetime = parser.isoparse(text)
+    return parsed.strftime("%Y-%m-%d")
+
+
 def build_file_name(account: str, year: str, args: Any) -> str:
     """Build CSV filename for an account and year.
 
@@ -141,19 +431,119 @@ def build_file_name(account: str, year: str, args: Any) -> str:
     if account not in args.account_map:
         raise KeyError(f"Account '{account}' not found in account map")
     account_info = args.account_map[account]
-    base_folder = Path(args.root_folder) / account_info.replace(":", "/")
-    filename = f"{year}-12-31-{account.replace(' ', '')}_Transactions_TelegramBot.csv"
-    return str(base_folder / filename)
+    return (
+        f"{args.root_folder.rstrip('/')}/{account_info.replace(':', '/')}/"
+        f"{year}-12-31-{account.replace(' ', '')}_Transactions_TelegramBot.csv"
+    )
+
+
+def ensure_directory(directory: str, created: set[str]) -> None:
+    """Create a directory and its parents, once per run.
+
+    Args:
+        directory: Directory to create
+        created: Directories already created, updated in place
+    """
+    if directory not in created:
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        created.add(directory)
 
 
-def check_connection(args: Any) -> None:
+def read_last_message_id(filename: str) -> int:
+    """Read the highest message ID stored in a CSV file.
+
+    Rows are appended in message order, so only the tail of the file is read to
+    find the last row. If the last row cannot be parsed the whole file is scanned.
+
+    Args:
+        filename: CSV file written by the downloader
+
+    Returns:
+        Highest message ID in the file, or 0 if there is none
+    """
+    with open(filename, "rb") as f:
+        size = f.seek(0, SEEK_END)
+        f.seek(max(0, size - TAIL_SIZE))
+        lines = f.read().splitlines()
+    for line in reversed(lines):
+        if line.strip():
+            try:
+                return int(line.split(b";", 1)[0])
+            except ValueError:
+                break
+    return scan_last_message_id(filename)
+
+
+def scan_last_message_id(filename: str) -> int:
+    """Scan all rows of a CSV file for the highest message ID.
+
+    Args:
+        filename: CSV file written by the downloader
+
+    Returns:
+        Highest message ID in the file, or 0 if there is none
+    """
+    with open(filename, encoding="utf-8", newline="") as csvfile:
+        reader = csv.reader(csvfile, delimiter=";")
+        next(reader, None)  # Skip header
+        return max(
+            (int(row[0]) for row in reader if row and row[0].isdigit()),
+            default=0,
+        )
+
+
+def find_last_message_id(accounts: Iterable[str], args: Any) -> int:
+    """Find the highest message ID saved for a set of accounts.
+
+    Every yearly file is checked: a backdated transaction is stored in the file
+    of its transaction year, which may not be the most recent one. Each account
+    folder is listed once, even when several accounts share it.
+
+    Args:
+        accounts: Account names
+        args: Parsed arguments containing account_map and root_folder
+
+    Returns:
+        Highest saved message ID, or 0 if no file exists
+    """
+    # File name suffixes (everything after the year) by folder
+    suffixes: dict[str, set[str]] = {}
+    for account in accounts:
+        directory, name = split(build_file_name(account, "", args))
+        suffixes.setdefault(directory, set()).add(name)
+
+    last_message_id = 0
+    for directory, names in suffixes.items():
+        try:
+            with scandir(directory) as it:
+                filenames = [
+                    entry.path
+                    for entry in it
+                    if entry.name[4:] in names
+                    and entry.name[:4].isascii()
+                    and entry.name[:4].isdigit()
+                ]
+        except FileNotFoundError:
+            continue
+        for filename in filenames:
+            try:
+                last_message_id = max(last_message_id, read_last_message_id(filename))
+            except OSError:
+                # File can't be read, continue
+                continue
+    return last_message_id
+
+
+def check_connection(args: Any, client: Any = None) -> None:
     """Check Telegram connection and display chat information.
 
     Args:
         args: Parsed arguments containing session_file, api_id, api_hash, chat_id
+        client: Telegram client to use; a new one is created from args if omitted
     """
     print("Connecting to Telegram client...")
-    client = TelegramClient(args.session_file, args.api_id, args.api_hash)
+    if client is None:
+        client = TelegramClient(args.session_file, args.api_id, args.api_hash)
     with client:
         # Loop over messages
         the_chat = client.get_entity(args.chat_id)  # type: ignore[attr-defined]
@@ -169,19 +559,6 @@ def beancount_telegram() -> None:
     Parses command-line arguments and downloads/processes Telegram messages
     to create CSV files compatible with the Telegram importer.
     """
-    fieldnames = [
-        "id",
-        "sender",
-        "message_date",
-        "transaction_date",
-        "account",
-        "payee",
-        "description",
-        "amount",
-        "currency",
-        "tag",
-    ]
-
     # The argument parser
     ap = ArgumentParser(
         prog=MODULE_NAME,
@@ -286,23 +663,30 @@ def beancount_telegram() -> None:
     # Parse the arguments
     args = ap.parse_args()
 
+    # Mandatory arguments, except for the connection check
+    if not args.check:
+        if args.account_map is None:
+            raise ArgumentError(acc_arg, "Missing account map")
+        if not args.no_download:
+            if args.root_folder is None:
+                raise ArgumentError(root_arg, "Missing beancount records root folder")
+            if args.temp_folder is None:
+                raise ArgumentError(
+                    tmp_arg, "Missing beancount records temporary folder"
+                )
+
     # Create session file directory if it does not exist
     Path(args.session_file).parent.mkdir(parents=True, exist_ok=True)
 
+    # Telegram client, shared by the connection check and the download. It is
+    # created once the arguments are valid: it opens the session file
+    client = TelegramClient(args.session_file, args.api_id, args.api_hash)
+
     # Check connection?
     if args.check:
-        check_connection(args)
+        check_connection(args, client)
         return
 
-    # Mandatory arguments
-    if args.account_map is None:
-        raise ArgumentError(acc_arg, "Missing account map")
-    if not args.no_download:
-        if args.root_folder is None:
-            raise ArgumentError(root_arg, "Missing beancount records root folder")
-        if args.temp_folder is None:
-            raise ArgumentError(tmp_arg, "Missing beancount records temporary folder")
-
     last_message_id = 0
     if args.force and not args.dry_run:
         # Clean files if --force
@@ -314,44 +698,25 @@ def beancount_telegram() -> None:
                 remove(filename)
     else:
         # Only update files, find the latest message in saved files
-        for account in args.account_map.keys():
-            for year in range(2022, 2300):
-                try:
-                    filename = build_file_name(account, str(year), args)
-                    if isfile(filename):
-                        with open(filename, encoding="utf-8") as csvfile:
-                            reader = csv.DictReader(
-                                csvfile,
-                                [
-                                    "id",
-                                    "sender",
-                                    "message_date",
-                                    "transaction_date",
-                                    "account",
-                                    "payee",
-                                    "description",
-                                    "amount",
-                                    "currency",
-                                    "tag",
-                                ],
-                                delimiter=";",
-                            )
-                            rows = list(reader)[1:]  # Skip header
-                            for row in rows:
-                                try:
-                                    message_id = int(row["id"])
-                                    if message_id > last_message_id:
-                                        last_message_id = message_id
-                                except (ValueError, KeyError):
-                                    continue
-                except (KeyError, OSError):
-                    # File doesn't exist or can't be read, continue
-                    continue
+        last_message_id = find_last_message_id(args.account_map.keys(), args)
         print(f"Updating messages with ID > {last_message_id}")
 
+    # Base folders of downloaded attachments
+    root_folder = (args.root_folder or "").rstrip("/")
+    temp_folder = (args.temp_folder or "").rstrip("/")
+
+    # File names already built, by account and year
+    file_names: dict[tuple[str, str], str] = {}
+
+    # Directories already created in this run
+    created_dirs: set[str] = set()
+
     # Connect to the Telegram client
-    client = TelegramClient(args.session_file, args.api_id, args.api_hash)
-    with client:
+    with (
+        client,
+        TransactionWriter() as writer,
+        AttachmentDownloader(client) as downloader,
+    ):
         # Loop over messages
         for msg in client.iter_messages(
             args.chat_id, reverse=True, min_id=last_message_id
@@ -363,81 +728,61 @@ def beancount_telegram() -> None:
 
             sender_name = msg.sender.first_name.strip() if msg.sender.first_name else ""
             message_date_str = msg.date.strftime("%Y-%m-%d") if msg.date else ""
-            entry: dict[str, str] = {
-                "id": str(msg.id),
-                "sender": sender_name,
-                "message_date": message_date_str,
-            }
 
             # Parse fields of a valid transaction
             transaction_parsed = False
-            if msg.text:
+            # Captions without enough fields cannot be transactions; skip the
+            # date parser for them and go straight to the attachment branch
+            if msg.text and msg.text.count(";") >= 4:
                 try:
                     # Parse message text
-                    fields = msg.text.split(";")
-                    if len(fields) < 5:
-                        raise ValueError("Not enough fields in transaction message")
-
-                    parsed_date = parser.parse(fields[0])
-                    if isinstance(parsed_date, datetime):
-                        entry["transaction_date"] = parsed_date.strftime("%Y-%m-%d")
-                    elif isinstance(parsed_date, date):
-                        entry["transaction_date"] = parsed_date.strftime("%Y-%m-%d")
-                    else:
-                        # Fallback for unexpected types
-                        entry["transaction_date"] = str(parsed_date)
-                    entry["account"] = fields[1].strip().replace(" ", "")
-                    entry["payee"] = fields[2].strip()
-                    entry["description"] = fields[3].strip()
-                    amount_parts = fields[4].strip().split(" ")
+                    fields = [field.strip() for field in msg.text.split(";")]
+
+                    transaction_date = parse_transaction_date(fields[0])
+                    account = fields[1].replace(" ", "")
+                    amount_parts = fields[4].split()
                     if len(amount_parts) < 2:
                         raise ValueError("Invalid amount format")
-                    entry["amount"] = amount_parts[0].strip()
-                    entry["currency"] = amount_parts[1].strip()
-                    entry["tag"] = fields[5].strip() if len(fields) > 5 else ""
+                    entry = Entry(
+                        id=str(msg.id),
+                        sender=sender_name,
+                        message_date=message_date_str,
+                        transaction_date=transaction_date,
+                        account=account,
+                        payee=fields[2],
+                        description=fields[3],
+                        amount=amount_parts[0],
+                        currency=amount_parts[1],
+                        tag=fields[5] if len(fields) > 5 else "",
+                    )
 
                     # Identify account
-                    if entry["account"] not in args.account_map:
+                    if account not in args.account_map:
                         print(
-                            f"Warning: Invalid account <{entry['account']}> "
-                            f"in message <{msg.text}> from {entry['message_date']}"
+                            f"Warning: Invalid account <{account}> "
+                            f"in message <{msg.text}> from {message_date_str}"
                         )
                         continue
 
                     # File name associated to transaction
-                    filename = build_file_name(
-                        entry["account"], entry["transaction_date"][0:4], args
-                    )
+                    file_key = (account, transaction_date[0:4])
+                    try:
+                        filename = file_names[file_key]
+                    except KeyError:
+                        filename = build_file_name(*file_key, args)
+                        file_names[file_key] = filename
 
                     # Ensure directory exists
-                    Path(filename).parent.mkdir(parents=True, exist_ok=True)
+                    ensure_directory(dirname(filename), created_dirs)
 
                     # Dry run?
                     if args.dry_run:
-                        print(f"{filename}: {entry}")
+                        print(f"{filename}: {entry._asdict()}")
                         transaction_parsed = True
                         continue
 
-                    # Create new file?
-                    if not isfile(filename):
-                        print(f"Creating file {filename}")
-                        with open(filename, "w", encoding="UTF-8", newline="") as f:
-                            # Create the csv writer and write the header
-                            writer = csv.DictWriter(
-                                f, fieldnames=fieldnames, delimiter=";"
-                            )
-                            writer.writeheader()
-
-                            # Write the entry
-                            writer.writerow(entry)
-                    # Open file to append entry
-                    else:
-                        with open(filename, "a", encoding="UTF-8", newline="") as f:
-                            # Create the csv writer and append the entry
-                            writer = csv.DictWriter(
-                                f, fieldnames=fieldnames, delimiter=";"
-                            )
-                            writer.writerow(entry)
+                    # Append entry
+                    writer.add(filename, entry)
 
                     # Parsing successful
                     transaction_parsed = True
@@ -460,7 +805,7 @@ def beancount_telegram() -> None:
                     if not name:
                         continue
 
-                    extension = name[-4:] if len(name) >= 4 else ""
+                    extension = splitext(name)[1]
 
                     # Download?
                     if args.no_download:
@@ -470,38 +815,31 @@ def beancount_telegram() -> None:
                     attachment_handled = False
                     if args.attachment_map:
                         for pattern in args.attachment_map:
-                            if fnmatch(name, pattern.pattern):
+                            if pattern.matches(name):
                                 try:
                                     # Parse date
-                                    date_str = parser.isoparse(
+                                    date_str = parse_attachment_date(
                                         name[pattern.skip_init : pattern.skip_end]
-                                    ).strftime("%Y-%m-%d")
+                                    )
 
                                     # Build filename
                                     account_path = pattern.account.replace(":", "/")
-                                    base_folder = Path(args.root_folder) / account_path
-                                    filename = str(
-                                        base_folder
-                                        / f"{date_str}-{pattern.name}{extension}"
+                                    filename = (
+                                        f"{root_folder}/{account_path}/"
+                                        f"{date_str}-{pattern.name}{extension}"
                                     )
 
                                     # Handle duplicates
-                                    if isfile(filename):
-                                        filename = filename[:-4] + "_2" + filename[-4:]
+                                    filename = downloader.unique_name(filename)
 
                                     # Ensure directory exists
-                                    Path(filename).parent.mkdir(
-                                        parents=True, exist_ok=True
-                                    )
+                                    ensure_directory(dirname(filename), created_dirs)
 
                                     # Download file?
                                     if args.dry_run:
-                                        real_filename = filename
+                                        print(f"File downloaded: {filename}")
                                     else:
-                                        real_filename = client.download_media(
-                                            message=msg, file=filename
-                                        )
-                                    print(f"File downloaded: {real_filename}")
+                                        downloader.add(msg, filename)
                                     attachment_handled = True
                                     break
 
@@ -510,30 +848,22 @@ def beancount_telegram() -> None:
 
                     if not attachment_handled:
                         # File does not match any pattern
-                        filename = str(Path(args.temp_folder) / name)
-                        if isfile(filename):
-                            filename = filename[:-4] + "_2" + filename[-4:]
+                        filename = downloader.unique_name(f"{temp_folder}/{name}")
 
                         # Ensure directory exists
-                        Path(filename).parent.mkdir(parents=True, exist_ok=True)
+                        ensure_directory(dirname(filename), created_dirs)
 
                         if args.dry_run:
-                            real_filename = filename
+                            print(f"File downloaded: {filename}")
                         else:
-                            real_filename = client.download_media(
-                                message=msg, file=filename
-                            )
-                        print(f"File downloaded: {real_filename}")
+                            downloader.add(msg, filename)
                     continue
 
                 except (AttributeError, IndexError, OSError):
                     pass
 
             if not transaction_parsed:
-                print(
-                    f"Warning: Invalid message <{msg.text}> "
-                    f"from {entry['message_date']}"
-                )
+                print(f"Warning: Invalid message <{msg.text}> from {message_date_str}")
 
 
 def main() -> None:
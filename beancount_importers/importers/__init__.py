@@ -1,17 +1,45 @@
-"""Beancount Importers - Module with importers."""
-
-from .certo_one import Importer as certo_one_importer
-from .finpension import Importer as finpension_importer
-from .ibkr import Importer as ibkr_importer
-from .mintos import Importer as mintos_importer
-from .n26 import Importer as n26_importer
-from .neon import Importer as neon_importer
-from .revolut import Importer as revolut_importer
-from .sbb import Importer as sbb_importer
-from .splitwise import HouseHoldSplitWiseImporter as splitwise_hh_importer
-from .splitwise import TripSplitWiseImporter as splitwise_trip_importer
-from .telegram import Importer as telegram_importer
-from .zkb import ZkbCSVImporter as zkb_importer
+"""Beancount Importers - Module with importers.
+
+Importers are loaded on first access, so importing this package does not pull
+in the dependencies of importers that are never used. The importers exported by
+``from beancount_importers.importers import *`` can be restricted with the
+``BEANCOUNT_IMPORTERS_ENABLED`` environment variable, a comma-separated list of
+exported names or module names (e.g. ``n26,certo_one``).
+"""
+
+import os
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .certo_one import Importer as certo_one_importer
+    from .finpension import Importer as finpension_importer
+    from .ibkr import Importer as ibkr_importer
+    from .mintos import Importer as mintos_importer
+    from .n26 import Importer as n26_importer
+    from .neon import Importer as neon_importer
+    from .revolut import Importer as revolut_importer
+    from .sbb import Importer as sbb_importer
+    from .splitwise import HouseHoldSplitWiseImporter as splitwise_hh_importer
+    from .splitwise import TripSplitWiseImporter as splitwise_trip_importer
+    from .telegram import Importer as telegram_importer
+    from .zkb import ZkbCSVImporter as zkb_importer
+
+# Module and class name of each exported importer
+_IMPORTERS = {
+    "certo_one_importer": ("certo_one", "Importer"),
+    "finpension_importer": ("finpension", "Importer"),
+    "ibkr_importer": ("ibkr", "Importer"),
+    "mintos_importer": ("mintos", "Importer"),
+    "neon_importer": ("neon", "Importer"),
+    "n26_importer": ("n26", "Importer"),
+    "revolut_importer": ("revolut", "Importer"),
+    "sbb_importer": ("sbb", "Importer"),
+    "splitwise_hh_importer": ("splitwise", "HouseHoldSplitWiseImporter"),
+    "splitwise_trip_importer": ("splitwise", "TripSplitWiseImporter"),
+    "telegram_importer": ("telegram", "Importer"),
+    "zkb_importer": ("zkb", "ZkbCSVImporter"),
+}
 
 __all__ = [
     "certo_one_importer",
@@ -27,3 +55,39 @@ __all__ = [
     "telegram_importer",
     "zkb_importer",
 ]
+
+_enabled = {
+    name.strip()
+    for name in os.environ.get("BEANCOUNT_IMPORTERS_ENABLED", "").split(",")
+    if name.strip()
+}
+if _enabled:
+    __all__ = [
+        name for name in __all__ if name in _enabled or _IMPORTERS[name][0] in _enabled
+    ]
+
+
+def __getattr__(name: str) -> Any:
+    """Import an importer class on first access.
+
+    Args:
+        name: Exported importer name
+
+    Returns:
+        The importer class
+
+    Raises:
+        AttributeError: If name is not an exported importer
+    """
+    try:
+        module_name, class_name = _IMPORTERS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(import_module(f".{module_name}", __name__), class_name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    """List module attributes, including importers not loaded yet."""
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,15 @@
+from datetime import date, datetime
+from functools import lru_cache
+
+from dateutil.parser import parse
+
+
+@lru_cache(maxsize=4096)
+def parse_date(text: str) -> date:
+    # Exports are mostly ISO dates or timestamps, anything else goes through
+    # dateutil. Rows come in batches sharing a date: parse each date once
+    try:
+        return datetime.fromisoformat(text).date()
+    except ValueError:
+        parsed: datetime = parse(text)
+        return parsed.date()
@@ -1,7 +1,11 @@
 import csv
 import re
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, datetime, timedelta
 from decimal import Decimal
+from functools import lru_cache
+from os.path import getmtime, isfile
 from pathlib import Path
 from typing import Any
 
@@ -9,18 +13,37 @@ import beangulp
 import camelot
 from beancount.core import amount, data
 from beancount.core.number import D
-from dateutil.parser import parse
 from pypdf import PdfReader
 
+from ._dates import parse_date
+
+# Balance date and amount, and transactions (date, amount, description)
+Statement = tuple[date | None, Decimal | None, tuple[tuple[date, Decimal, str], ...]]
+
+_BALANCE_RE = re.compile(r"Saldo per (\d{2}\.\d{2}\.\d{4}) zu unseren Gunsten CHF")
+_DATE_RE = re.compile(r"\d{1,2}\.\d{1,2}\.\d{4}")
+
 
 def cleanDecimal(formatted_number: str) -> Decimal:
     return D(formatted_number.replace("'", ""))
 
 
-def parse_pdf_to_csv(pdf_file_name: str, csv_file_name: str) -> None:
-    transactions = []
+def _parse_date(text: str) -> date | None:
+    # Most rows are not dated: reject them without raising an exception
+    if not _DATE_RE.fullmatch(text):
+        return None
+    try:
+        return datetime.strptime(text, "%d.%m.%Y").date()
+    except ValueError:
+        return None
+
 
-    # get number of pages
+def _parse_pdf(pdf_file_name: str) -> Statement:
+    transactions: list[tuple[date, Decimal, str]] = []
+
+    # get number of pages: pypdf reads it from the page tree without loading the
+    # pages, and the last pages must be excluded because their layout makes
+    # camelot fail or return non-transaction rows
     reader = PdfReader(pdf_file_name)
     n_pages = len(reader.pages)
 
@@ -56,71 +79,167 @@ def parse_pdf_to_csv(pdf_file_name: str, csv_file_name: str) -> None:
     balance_amount = None
 
     for table in tables:
-        for _index, row in table.df.iterrows():
-            if len(tuple(row)) == 5:
-                _, book_date, text, credit, debit = tuple(row)
-            elif len(tuple(row)) == 4:
-                book_date, text, credit, debit = tuple(row)
-            else:
-                # Balance in a separate table
-                text, value = tuple(row)
-                balance_match = re.search(
-                    r"Saldo per (\d\d\.\d\d\.\d\d\d\d) zu unseren Gunsten CHF", text
-                )
+        df = table.df
+        if len(df.columns) not in (4, 5):
+            # Balance in a separate table
+            for text, value in df.itertuples(index=False, name=None):
+                balance_match = _BALANCE_RE.search(text)
                 if balance_match:
-                    balance_date = balance_match.group(1)
-                    balance_date = datetime.strptime(balance_date, "%d.%m.%Y").date()
+                    balance_date = datetime.strptime(
+                        balance_match.group(1), "%d.%m.%Y"
+                    ).date()
                     # add 1 day: cembra provides balance at EOD, beancount checks at SOD
                     balance_date = balance_date + timedelta(days=1)
                     balance_amount = cleanDecimal(value)
-                continue
+            continue
 
-            book_date, text, credit, debit = (
-                book_date.strip(),
-                text.strip(),
-                credit.strip(),
-                debit.strip(),
-            )
+        # Canonical columns: booking date, text, credit, debit
+        df = df.iloc[:, -4:].apply(lambda column: column.str.strip())
+        df.columns = ["book_date", "text", "credit", "debit"]
 
-            # Transaction entry
-            try:
-                book_date = datetime.strptime(book_date, "%d.%m.%Y").date()
-            except Exception:
-                book_date = None
+        # Transaction entries: rows with a valid booking date
+        book_dates = df["book_date"].map(_parse_date)
+        is_transaction = book_dates.notna()
+        rows = df[is_transaction]
+        credits = rows["credit"].str.replace("'", "", regex=False)
+        debits = rows["debit"].str.replace("'", "", regex=False)
+        values = [
+            -D(debit) if debit else D(credit)
+            for credit, debit in zip(credits, debits, strict=True)
+        ]
+        transactions.extend(
+            zip(book_dates[is_transaction], values, rows["text"], strict=True)
+        )
 
-            if book_date:
-                value = -cleanDecimal(debit) if debit else cleanDecimal(credit)
-                transactions.append([book_date, value, text])
+        # Balance entry
+        rows = df[~is_transaction]
+        balance_dates = rows["text"].str.extract(_BALANCE_RE.pattern, expand=False)
+        for match, credit, debit in zip(
+            balance_dates, rows["credit"], rows["debit"], strict=True
+        ):
+            if not isinstance(match, str):
                 continue
-
-            # Balance entry
             try:
-                balance_match = re.search(
-                    r"Saldo per (\d\d\.\d\d\.\d\d\d\d) zu unseren Gunsten CHF", text
-                )
-                if balance_match:
-                    balance_date = balance_match.group(1)
-                    balance_date = datetime.strptime(balance_date, "%d.%m.%Y").date()
-                    # add 1 day: cembra provides balance at EOD, beancount checks at SOD
-                    balance_date = balance_date + timedelta(days=1)
-                    balance_amount = (
-                        cleanDecimal(debit) if debit else -cleanDecimal(credit)
-                    )
-            except Exception:
+                balance_date = datetime.strptime(match, "%d.%m.%Y").date()
+                # add 1 day: cembra provides balance at EOD, beancount checks at SOD
+                balance_date = balance_date + timedelta(days=1)
+                balance_amount = cleanDecimal(debit) if debit else -cleanDecimal(credit)
+            except ValueError:
                 pass
 
-    # Write to CSV file
-    with open(csv_file_name, "w") as f:
+    return balance_date, balance_amount, tuple(transactions)
+
+
+def _write_csv(csv_file_name: str, statement: Statement) -> None:
+    balance_date, balance_amount, transactions = statement
+    with open(csv_file_name, "w", newline="") as f:
+        writer = csv.writer(f, delimiter=";", lineterminator="\n")
+
         # Header
-        f.write("Date;Amount;Description\n")
+        writer.writerow(("Date", "Amount", "Description"))
 
         # Balance
         if balance_date is not None and balance_amount is not None:
-            f.write(f"{balance_date};{balance_amount};BALANCE\n")
+            writer.writerow((balance_date, balance_amount, "BALANCE"))
 
         # Transactions
-        for transaction in transactions:
-            f.write("{};{};{}\n".format(*transaction))
+        writer.writerows(transactions)
+
+
+def parse_pdf_to_csv(pdf_file_name: str, csv_file_name: str) -> None:
+    _write_csv(csv_file_name, _parse_pdf(pdf_file_name))
+
+
+def _fast_date(text: str) -> date:
+    # CSV files are written with ISO dates; files from other sources may use the
+    # statement format, which dateutil would read month first
+    if _DATE_RE.fullmatch(text):
+        return datetime.strptime(text, "%d.%m.%Y").date()
+    return parse_date(text)
+
+
+@lru_cache(maxsize=32)
+def _read_csv(csv_file_name: str, mtime: float) -> Statement:
+    # Cached by modification time, so a regenerated file is read again
+    balance_date = None
+    balance_amount = None
+    transactions = []
+    with open(csv_file_name, newline="") as csvfile:
+        reader = csv.reader(csvfile, delimiter=";")
+        next(reader, None)  # Header
+        for row in reader:
+            # The balance, if any, is the first row after the header
+            if reader.line_num == 2 and row[2] == "BALANCE":
+                balance_date = _fast_date(row[0].strip())
+                balance_amount = D(row[1])
+                continue
+            transactions.append((_fast_date(row[0].strip()), D(row[1]), row[2]))
+    return balance_date, balance_amount, tuple(transactions)
+
+
+def _current_csv_mtime(pdf_file_name: str) -> float | None:
+    # Modification time of the CSV file, unless it is missing or older than the PDF
+    csv_file = Path(pdf_file_name).with_suffix(".csv")
+    if csv_file.is_file():
+        csv_mtime = csv_file.stat().st_mtime
+        if not isfile(pdf_file_name) or getmtime(pdf_file_name) <= csv_mtime:
+            return csv_mtime
+    return None
+
+
+def _load_statement(pdf_file_name: str) -> Statement:
+    # Parse the PDF to a CSV file, unless the CSV file is up to date
+    csv_file = str(Path(pdf_file_name).with_suffix(".csv"))
+    csv_mtime = _current_csv_mtime(pdf_file_name)
+    if csv_mtime is not None:
+        return _read_csv(csv_file, csv_mtime)
+
+    statement = _parse_pdf(pdf_file_name)
+    _write_csv(csv_file, statement)
+    return statement
+
+
+def _update_csv(pdf_file_name: str) -> None:
+    parse_pdf_to_csv(pdf_file_name, str(Path(pdf_file_name).with_suffix(".csv")))
+
+
+def prewarm_csvs(pdf_file_names: Iterable[str], max_workers: int | None = None) -> None:
+    """Parse PDF statements to their CSV files in parallel processes.
+
+    Statements with an up-to-date CSV file are skipped. Calling this before
+    importing several statements lets extract() read the CSV files instead of
+    parsing each PDF in turn.
+
+    Args:
+        pdf_file_names: Paths of the PDF statements
+        max_workers: Maximum number of processes, defaults to the number of CPUs
+    """
+    pending = [name for name in pdf_file_names if _current_csv_mtime(name) is None]
+    if not pending:
+        return
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for _ in executor.map(_update_csv, pending):
+            pass
+
+
+def _union_regex(patterns: list[str]) -> re.Pattern[str] | None:
+    # Alternative i matches at the start of a string wherever pattern i would be
+    # found, so the first matching pattern wins as with sequential searches; its
+    # empty group "_i" identifies it. Patterns with their own groups (which
+    # would be renumbered) or inline global flags are not combined.
+    if not patterns:
+        return None
+    try:
+        if any(re.compile(pattern).groups for pattern in patterns):
+            return None
+        return re.compile(
+            "|".join(
+                rf"(?=[\s\S]*?(?:{pattern}))(?P<_{index}>)"
+                for index, pattern in enumerate(patterns)
+            )
+        )
+    except re.error:
+        return None
 
 
 class Importer(beangulp.Importer):
@@ -133,19 +252,43 @@ class Importer(beangulp.Importer):
         narration_map: dict[str, tuple[str, str]] | None = None,
     ):
         self._filepattern = filepattern
+        self._filepattern_re = re.compile(filepattern)
         self._account = account
         self.currency = "CHF"
         self.narration_map: dict[str, tuple[str, str]] = narration_map or {}
+        self._narration_patterns = [re.compile(p) for p in self.narration_map]
+        self._narrations = list(self.narration_map.values())
+        self._narration_re = _union_regex(list(self.narration_map))
 
-    def identify(self, filepath: str | Any) -> bool:
+    def _narrate(self, beschreibung: str) -> tuple[str, str]:
+        # Payee and narration of the first matching pattern in narration_map
+        if self._narration_re is not None:
+            match = self._narration_re.match(beschreibung)
+            if match and match.lastgroup:
+                return self._narrations[int(match.lastgroup[1:])]
+        else:
+            for pattern, narration in zip(
+                self._narration_patterns, self._narrations, strict=True
+            ):
+                if pattern.search(beschreibung):
+                    return narration
+        return "", beschreibung
+
+    @staticmethod
+    def _resolve_path(filepath: str | Any) -> str:
         # Handle both string filepaths and _FileMemo objects from beancount-import
-        path = (
+        if isinstance(filepath, str):
+            return filepath
+        return str(
             getattr(filepath, "filepath", None)
             or getattr(filepath, "name", None)
             or getattr(filepath, "filename", None)
-            or str(filepath)
+            or filepath
         )
-        return re.search(self._filepattern, path) is not None
+
+    def identify(self, filepath: str | Any) -> bool:
+        path = self._resolve_path(filepath)
+        return self._filepattern_re.search(path) is not None
 
     def name(self) -> str:
         return str(super().name + self.account())
@@ -156,64 +299,31 @@ class Importer(beangulp.Importer):
     def extract(
         self, filepath: str | Any, existing_entries: data.Entries | None = None
     ) -> data.Entries:
-        # Handle both string filepaths and _FileMemo objects from beancount-import
-        path = (
-            getattr(filepath, "filepath", None)
-            or getattr(filepath, "name", None)
-            or getattr(filepath, "filename", None)
-            or str(filepath)
-        )
+        path = self._resolve_path(filepath)
         entries = []
 
-        # Parse the PDF to a CSV file
-        csv_file = Path(path).with_suffix(".csv")
-        if not csv_file.is_file():
-            parse_pdf_to_csv(path, str(csv_file))
-
-        # Read the CSV file
-        with open(str(csv_file)) as csvfile:
-            reader = csv.reader(csvfile, delimiter=";")
-            rows = list(reader)
+        # Parse the PDF, or read the CSV file it was parsed to
+        balance_date, balance_amount, transactions = _load_statement(path)
 
         # Balance
-        parsed_balance_date = parse(rows[1][0].strip(), dayfirst=False)
-        if isinstance(parsed_balance_date, datetime):
-            balance_date = parsed_balance_date.date()
-        elif isinstance(parsed_balance_date, date):
-            balance_date = parsed_balance_date
-        else:
-            balance_date = date.today()
-        entries.append(
-            data.Balance(
-                data.new_metadata(path, 0),
-                balance_date,
-                self._account,
-                amount.Amount(-D(rows[1][1]), self.currency),
-                None,
-                None,
+        if balance_date is not None and balance_amount is not None:
+            entries.append(
+                data.Balance(
+                    data.new_metadata(path, 0),
+                    balance_date,
+                    self._account,
+                    amount.Amount(-balance_amount, self.currency),
+                    None,
+                    None,
+                )
             )
-        )
 
-        # Transactions
-        for row in rows[2:]:
-            parsed_date = parse(row[0].strip(), dayfirst=False)
-            if isinstance(parsed_date, datetime):
-                transaction_date = parsed_date.date()
-            elif isinstance(parsed_date, date):
-                transaction_date = parsed_date
-            else:
-                transaction_date = date.today()
-            cash_flow = D(row[1])
-            beschreibung = row[2]
-            meta = data.new_metadata(path, 0)
-
-            payee = ""
-            narration = beschreibung
-            for pattern, (p, n) in self.narration_map.items():
-                if re.search(pattern, beschreibung):
-                    payee = p
-                    narration = n
-                    break
+        # Transactions: metadata is copied, as beangulp marks duplicates in place
+        meta_template = data.new_metadata(path, 0)
+        for transaction_date, cash_flow, beschreibung in transactions:
+            meta = dict(meta_template)
+
+            payee, narration = self._narrate(beschreibung)
 
             entries.append(
                 data.Transaction(
@@ -227,7 +337,7 @@ class Importer(beangulp.Importer):
                     [
                         data.Posting(
                             self._account,
-                            amount.Amount(D(cash_flow), self.currency),
+                            amount.Amount(cash_flow, self.currency),
                             None,
                             None,
                             None,
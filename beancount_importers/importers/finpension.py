@@ -1,13 +1,51 @@
 import csv
-import datetime
 import re
-from datetime import date as date_type
+from collections.abc import Callable
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+from operator import itemgetter
 from typing import Any
 
 import beangulp
 from beancount.core import amount, data, position
 from beancount.core.number import D
-from dateutil.parser import parse
+
+from ._dates import parse_date
+
+# Builds the transaction of a row: meta, date, category, ISIN, shares, cash flow
+_Handler = Callable[[data.Meta, date, str, str, str, Decimal], data.Transaction]
+
+# Columns read from each row, by header name
+_COLUMNS = ("Date", "Category", "ISIN", "Number of Shares", "Cash Flow")
+
+# Sold lots are matched by the booking method
+_EMPTY_COST_SPEC = position.CostSpec(None, None, None, None, None, None)
+
+
+def _chf_posting(account: str, number: Decimal) -> data.Posting:
+    return data.Posting(account, amount.Amount(number, "CHF"), None, None, None, None)
+
+
+def _transaction(
+    meta: data.Meta, book_date: date, narration: str, postings: list[data.Posting]
+) -> data.Transaction:
+    return data.Transaction(
+        meta,
+        book_date,
+        "*",
+        "FinPension",
+        narration,
+        data.EMPTY_SET,
+        data.EMPTY_SET,
+        postings,
+    )
+
+
+@lru_cache(maxsize=4096)
+def _parse_decimal(text: str) -> Decimal:
+    # Amounts repeat across rows; Decimal is immutable, so instances are shared
+    return D(text)
 
 
 class Importer(beangulp.Importer):
@@ -22,20 +60,53 @@ class Importer(beangulp.Importer):
         securities: dict[str, list[str]],
     ):
         self._filepattern = filepattern
+        self._filepattern_re = re.compile(filepattern)
         self._parent_account = parent_account
         self._income_account = income_account
         self._fees_account = fees_account
         self._securities = securities
+        self._cash_account = parent_account + ":Cash"
+        self._interests_account = f"{income_account}:Interests"
+        self._security_accounts: dict[str, tuple[str, str, str, str]] = {}
+        self._handlers: dict[str, _Handler] = {
+            "Flat-rate administrative fee": self._fee,
+            "Deposit": self._deposit,
+            "Interests": self._interests,
+            "Dividend": self._dividend,
+            "Transfer": self._deposit,
+            "Buy": self._trade,
+            "Sell": self._trade,
+        }
 
-    def identify(self, filepath: str | Any) -> bool:
+    def _security(self, isin: str) -> tuple[str, str, str, str]:
+        # Security name and its holding, dividends and PnL accounts, by ISIN
+        accounts = self._security_accounts.get(isin)
+        if accounts is None:
+            security = self._securities[isin][0]
+            accounts = (
+                security,
+                f"{self._parent_account}:{security}",
+                f"{self._income_account}:{security}:Dividends",
+                f"{self._income_account}:{security}:PnL",
+            )
+            self._security_accounts[isin] = accounts
+        return accounts
+
+    @staticmethod
+    def _resolve_path(filepath: str | Any) -> str:
         # Handle both string filepaths and _FileMemo objects from beancount-import
-        path = (
+        if isinstance(filepath, str):
+            return filepath
+        return str(
             getattr(filepath, "filepath", None)
             or getattr(filepath, "name", None)
             or getattr(filepath, "filename", None)
-            or str(filepath)
+            or filepath
         )
-        return re.search(self._filepattern, path) is not None
+
+    def identify(self, filepath: str | Any) -> bool:
+        path = self._resolve_path(filepath)
+        return self._filepattern_re.search(path) is not None
 
     def name(self) -> str:
         return str(super().name + self.account())
@@ -43,290 +114,168 @@ class Importer(beangulp.Importer):
     def account(self, _: str | None = None) -> str:
         return self._parent_account
 
+    def _fee(
+        self,
+        meta: data.Meta,
+        book_date: date,
+        category: str,
+        isin: str,
+        shares_str: str,
+        cash_flow: Decimal,
+    ) -> data.Transaction:
+        return _transaction(
+            meta,
+            book_date,
+            category,
+            [
+                _chf_posting(self._cash_account, cash_flow),
+                _chf_posting(self._fees_account, -cash_flow),
+            ],
+        )
+
+    def _deposit(
+        self,
+        meta: data.Meta,
+        book_date: date,
+        category: str,
+        isin: str,
+        shares_str: str,
+        cash_flow: Decimal,
+    ) -> data.Transaction:
+        # Deposits and transfers: the other leg is booked elsewhere
+        return _transaction(
+            meta,
+            book_date,
+            category,
+            [
+                _chf_posting(self._cash_account, cash_flow),
+            ],
+        )
+
+    def _interests(
+        self,
+        meta: data.Meta,
+        book_date: date,
+        category: str,
+        isin: str,
+        shares_str: str,
+        cash_flow: Decimal,
+    ) -> data.Transaction:
+        return _transaction(
+            meta,
+            book_date,
+            category,
+            [
+                _chf_posting(self._cash_account, cash_flow),
+                _chf_posting(self._interests_account, -cash_flow),
+            ],
+        )
+
+    def _dividend(
+        self,
+        meta: data.Meta,
+        book_date: date,
+        category: str,
+        isin: str,
+        shares_str: str,
+        cash_flow: Decimal,
+    ) -> data.Transaction:
+        security, _, dividends_account, _ = self._security(isin.strip())
+        return _transaction(
+            meta,
+            book_date,
+            f"Dividends {security}",
+            [
+                _chf_posting(self._cash_account, cash_flow),
+                _chf_posting(dividends_account, -cash_flow),
+            ],
+        )
+
+    def _trade(
+        self,
+        meta: data.Meta,
+        book_date: date,
+        category: str,
+        isin: str,
+        shares_str: str,
+        cash_flow: Decimal,
+    ) -> data.Transaction:
+        security, sec_account, _, pnl_account = self._security(isin.strip())
+        number = _parse_decimal(shares_str.strip())
+        shares = amount.Amount(number, security)
+
+        # Price per share: cash flow and number of shares have opposite signs
+        per_share = -cash_flow / number
+
+        postings = [_chf_posting(self._cash_account, cash_flow)]
+        if category == "Sell":
+            postings.append(
+                data.Posting(
+                    sec_account,
+                    shares,
+                    _EMPTY_COST_SPEC,
+                    amount.Amount(per_share, "CHF"),
+                    None,
+                    None,
+                )
+            )
+            postings.append(data.Posting(pnl_account, None, None, None, None, None))
+        else:
+            cost_spec = position.CostSpec(per_share, None, "CHF", None, None, None)
+            postings.append(
+                data.Posting(sec_account, shares, cost_spec, None, None, None)
+            )
+
+        return _transaction(meta, book_date, f"{category} {security}", postings)
+
     def extract(
         self, filepath: str | Any, existing_entries: data.Entries | None = None
     ) -> data.Entries:
-        # Handle both string filepaths and _FileMemo objects from beancount-import
-        path = (
-            getattr(filepath, "filepath", None)
-            or getattr(filepath, "name", None)
-            or getattr(filepath, "filename", None)
-            or str(filepath)
-        )
-
+        path = self._resolve_path(filepath)
         entries = []
 
-        with open(path, encoding="utf-8") as csvfile:
-            reader = csv.DictReader(
-                csvfile,
-                [
-                    "date",
-                    "category",
-                    "asset",
-                    "ISIN",
-                    "shares",
-                    "currency",
-                    "fxRate",
-                    "priceCHF",
-                    "cashFlow",
-                    "balance",
-                ],
-                delimiter=";",
-                skipinitialspace=False,
-            )
-            rows = list(reader)[1:]
-
-        for index, row in enumerate(reversed(rows)):
-            # Parse
-            parsed_date = parse(row["date"].strip())
-            if isinstance(parsed_date, datetime.datetime):
-                book_date: date_type = parsed_date.date()
-            elif isinstance(parsed_date, date_type):
-                book_date = parsed_date
-            else:
-                book_date = date_type.today()
-            meta = data.new_metadata(path, index)
-            cashFlow = amount.Amount(D(row["cashFlow"]), "CHF")
-            category = row["category"].strip()
-
-            # Fees, Deposits & Dividends
-            if category == "Flat-rate administrative fee":
-                entries.append(
-                    data.Transaction(
-                        meta,
-                        book_date,
-                        "*",
-                        "FinPension",
-                        category,
-                        data.EMPTY_SET,
-                        data.EMPTY_SET,
-                        [
-                            data.Posting(
-                                self._parent_account + ":Cash",
-                                cashFlow,
-                                None,
-                                None,
-                                None,
-                                None,
-                            ),
-                            data.Posting(
-                                self._fees_account,
-                                -cashFlow,
-                                None,
-                                None,
-                                None,
-                                None,
-                            ),
-                        ],
-                    )
-                )
-            elif category == "Deposit":
-                entries.append(
-                    data.Transaction(
-                        meta,
-                        book_date,
-                        "*",
-                        "FinPension",
-                        category,
-                        data.EMPTY_SET,
-                        data.EMPTY_SET,
-                        [
-                            data.Posting(
-                                self._parent_account + ":Cash",
-                                cashFlow,
-                                None,
-                                None,
-                                None,
-                                None,
-                            ),
-                        ],
-                    )
-                )
-            elif category == "Interests":
-                interests_account = f"{self._income_account}:Interests"
-                entries.append(
-                    data.Transaction(
-                        meta,
-                        book_date,
-                        "*",
-                        "FinPension",
-                        category,
-                        data.EMPTY_SET,
-                        data.EMPTY_SET,
-                        [
-                            data.Posting(
-                                self._parent_account + ":Cash",
-                                cashFlow,
-                                None,
-                                None,
-                                None,
-                                None,
-                            ),
-                            data.Posting(
-                                interests_account,
-                                -cashFlow,
-                                None,
-                                None,
-                                None,
-                                None,
-                            ),
-                        ],
-                    )
-                )
-            elif category == "Dividend":
-                security = self._securities[row["ISIN"].strip()][0]
-                pnl_account = f"{self._income_account}:{security}:Dividends"
-                entries.append(
-                    data.Transaction(
-                        meta,
-                        book_date,
-                        "*",
-                        "FinPension",
-                        f"Dividends {security}",
-                        data.EMPTY_SET,
-                        data.EMPTY_SET,
-                        [
-                            data.Posting(
-                                self._parent_account + ":Cash",
-                                cashFlow,
-                                None,
-                                None,
-                                None,
-                                None,
-                            ),
-                            data.Posting(
-                                pnl_account,
-                                -cashFlow,
-                                None,
-                                None,
-                                None,
-                                None,
-                            ),
-                        ],
-                    )
-                )
-            elif category == "Transfer":
-                entries.append(
-                    data.Transaction(
-                        meta,
-                        book_date,
-                        "*",
-                        "FinPension",
-                        category,
-                        data.EMPTY_SET,
-                        data.EMPTY_SET,
-                        [
-                            data.Posting(
-                                self._parent_account + ":Cash",
-                                cashFlow,
-                                None,
-                                None,
-                                None,
-                                None,
-                            ),
-                        ],
-                    )
-                )
-            elif category == "Buy":
-                # This is a buy
-                isin = row["ISIN"].strip()
-                security = self._securities[isin][0]
-                shares = amount.Amount(D(row["shares"].strip()), security)
-                sec_account = self._parent_account + ":" + security
-
-                # Calculate cost per share from cash flow
-                # cashFlow is negative for buys
-                if shares.number is None:
-                    raise ValueError("Shares amount is missing")
-                if cashFlow.number is None:
-                    raise ValueError("Cash flow amount is missing")
-                cost_per_share = -cashFlow.number / shares.number
-
-                cost_spec = position.CostSpec(
-                    cost_per_share, None, "CHF", None, None, None
-                )
+        with open(path, encoding="utf-8", newline="") as csvfile:
+            reader = csv.reader(csvfile, delimiter=";")
+            header = [name.strip() for name in next(reader, [])]
+            if not header:
+                return []
+            try:
+                indices = [header.index(name) for name in _COLUMNS]
+            except ValueError as e:
+                raise ValueError(f"Unexpected header in {path}: {header}") from e
+            columns = max(indices) + 1
+            get_fields = itemgetter(*indices)
 
-                entries.append(
-                    data.Transaction(
-                        meta,
-                        book_date,
-                        "*",
-                        "FinPension",
-                        f"{category} {security}",
-                        data.EMPTY_SET,
-                        data.EMPTY_SET,
-                        [
-                            data.Posting(
-                                self._parent_account + ":Cash",
-                                cashFlow,
-                                None,
-                                None,
-                                None,
-                                None,
-                            ),
-                            data.Posting(
-                                sec_account, shares, cost_spec, None, None, None
-                            ),
-                        ],
-                    )
-                )
-            elif category == "Sell":
-                # This is a sell
-                isin = row["ISIN"].strip()
-                security = self._securities[isin][0]
-                shares = amount.Amount(D(row["shares"].strip()), security)
-                sec_account = self._parent_account + ":" + security
-                pnl_account = f"{self._income_account}:{security}:PnL"
-
-                # Calculate price per share from cash flow
-                # cashFlow is positive for sells
-                if shares.number is None:
-                    raise ValueError("Shares amount is missing")
-                if cashFlow.number is None:
-                    raise ValueError("Cash flow amount is missing")
-                share_price = amount.Amount(D(-cashFlow.number / shares.number), "CHF")
-
-                cost_spec = position.CostSpec(
-                    number_per=None,
-                    number_total=None,
-                    currency=None,
-                    date=None,
-                    label=None,
-                    merge=None,
-                )
+            for row in reader:
+                if not row:
+                    continue
+                if len(row) < columns:
+                    raise ValueError(f"Error parsing line {reader.line_num}: {row}")
+                date_str, category, isin, shares_str, cash_flow_str = get_fields(row)
+
+                category = category.strip()
+                handler = self._handlers.get(category)
+                if handler is None:
+                    raise Warning(f"Unknown category {category}")
 
-                entries.append(
-                    data.Transaction(
-                        meta,
-                        book_date,
-                        "*",
-                        "FinPension",
-                        f"{category} {security}",
-                        data.EMPTY_SET,
-                        data.EMPTY_SET,
-                        [
-                            data.Posting(
-                                self._parent_account + ":Cash",
-                                cashFlow,
-                                None,
-                                None,
-                                None,
-                                None,
-                            ),
-                            data.Posting(
-                                sec_account, shares, cost_spec, share_price, None, None
-                            ),
-                            data.Posting(
-                                pnl_account,
-                                None,
-                                None,
-                                None,
-                                None,
-                                None,
-                            ),
-                        ],
+                # Bad dates and numbers raise ValueError, missing shares a
+                # decimal error when dividing
+                meta = data.new_metadata(path, 0)
+                try:
+                    book_date = parse_date(date_str.strip())
+                    cash_flow = _parse_decimal(cash_flow_str.strip())
+                    entry = handler(
+                        meta, book_date, category, isin, shares_str, cash_flow
                     )
-                )
-            else:
-                raise Warning(f"Unknown category {category}")
+                except (ValueError, ArithmeticError) as e:
+                    raise ValueError(
+                        f"Error parsing line {reader.line_num}: {row}"
+                    ) from e
+                entries.append(entry)
+
+        # Entries are returned in reverse file order, as they always have been
+        entries.reverse()
+        for index, entry in enumerate(entries):
+            entry.meta["lineno"] = index
+
         return entries
@@ -1,16 +1,66 @@
+import csv
 import itertools
 import logging
 import re
 import warnings
-from csv import DictReader
-from datetime import date, datetime
-from typing import Any
+from collections.abc import Callable
+from datetime import date
+from decimal import Decimal
+from typing import Any, NamedTuple
 
 import beangulp
 from beancount.core import amount, data, position
-from beancount.core.data import Directive
 from beancount.core.number import D
-from dateutil.parser import parse
+
+from ._dates import parse_date
+
+# Columns of the Flex Query CSV file, which has no header row
+(
+    ID,
+    DATE,
+    TYPE,
+    CURRENCY,
+    PROCEEDS,
+    SECURITY,
+    AMOUNT,
+    COST_BASIS,
+    TRADE_PRICE,
+    COMMISSION,
+    COMMISSION_CURRENCY,
+) = range(11)
+COLUMNS = COMMISSION_CURRENCY + 1
+
+
+# Builds the transaction of a row: row, meta, date, proceeds
+_Handler = Callable[[list[str], data.Meta, date, Decimal], data.Transaction]
+
+
+class WithholdingTax(NamedTuple):
+    """A withholding tax, to be merged into its dividend."""
+
+    security: str
+    date: date
+    number: Decimal
+    currency: str
+    meta: data.Meta
+
+    @property
+    def value(self) -> amount.Amount:
+        return amount.Amount(self.number, self.currency)
+
+
+_ZERO = Decimal()
+
+
+def _parse_commission(text: str) -> Decimal:
+    # Most trades are free of commission: share one zero instead of parsing it
+    if text in ("", "0"):
+        return _ZERO
+    return D(text)
+
+
+def _posting(account: str, units: amount.Amount | None) -> data.Posting:
+    return data.Posting(account, units, None, None, None, None)
 
 
 class Importer(beangulp.Importer):
@@ -26,6 +76,7 @@ class Importer(beangulp.Importer):
         name_account: str,
     ):
         self._filepattern = filepattern
+        self._filepattern_re = re.compile(filepattern)
         self._parent_account = parent_account
         self._income_account = income_account
         self.cash_account = parent_account + ":Cash"
@@ -34,17 +85,44 @@ class Importer(beangulp.Importer):
         self.fees_account = fees_account
         self.pnl_account = income_account + ":PnL"
         self.name_account = name_account
+        self._security_accounts: dict[str, tuple[str, str]] = {}
+        self._handlers: dict[str, _Handler] = {
+            "Deposits/Withdrawals": self._deposit,
+            "Dividends": self._dividend,
+            "Other Fees": self._other_fee,
+            "Broker Interest Received": self._interests,
+            "BUY": self._buy,
+            "SELL": self._sell,
+        }
+
+    def _accounts(self, security: str) -> tuple[str, str]:
+        """Return the holding and dividends accounts of a security."""
+        accounts = self._security_accounts.get(security)
+        if accounts is None:
+            accounts = (
+                f"{self._parent_account}:{security}",
+                f"{self._income_account}:{security}:Dividends",
+            )
+            self._security_accounts[security] = accounts
+        return accounts
 
-    def identify(self, filepath: str | Any) -> bool:
-        """Identify if the file matches the pattern."""
+    @staticmethod
+    def _resolve_path(filepath: str | Any) -> str:
+        """Return the path of a file given as a string or a file object."""
         # Handle both string filepaths and _FileMemo objects from beancount-import
-        path = (
+        if isinstance(filepath, str):
+            return filepath
+        return str(
             getattr(filepath, "filepath", None)
             or getattr(filepath, "name", None)
             or getattr(filepath, "filename", None)
-            or str(filepath)
+            or filepath
         )
-        return re.search(self._filepattern, path) is not None
+
+    def identify(self, filepath: str | Any) -> bool:
+        """Identify if the file matches the pattern."""
+        path = self._resolve_path(filepath)
+        return self._filepattern_re.search(path) is not None
 
     def name(self) -> str:
         """Return the name of the importer."""
@@ -54,17 +132,182 @@ class Importer(beangulp.Importer):
         """Return the account for this importer."""
         return self._parent_account
 
+    def _transaction(
+        self,
+        meta: data.Meta,
+        book_date: date,
+        narration: str,
+        postings: list[data.Posting],
+    ) -> data.Transaction:
+        return data.Transaction(
+            meta,
+            book_date,
+            "*",
+            "Interactive Brokers",
+            narration,
+            data.EMPTY_SET,
+            data.EMPTY_SET,
+            postings,
+        )
+
+    def _deposit(
+        self, row: list[str], meta: data.Meta, book_date: date, proceeds: Decimal
+    ) -> data.Transaction:
+        cashFlow = amount.Amount(proceeds, row[CURRENCY])
+        return self._transaction(
+            meta,
+            book_date,
+            "Deposit" if proceeds > _ZERO else "Withdrawal",
+            [
+                _posting(self.cash_account, cashFlow),
+            ],
+        )
+
+    def _dividend(
+        self, row: list[str], meta: data.Meta, book_date: date, proceeds: Decimal
+    ) -> data.Transaction:
+        cashFlow = amount.Amount(proceeds, row[CURRENCY])
+        security = row[SECURITY]
+        _, dividend_account = self._accounts(security)
+        return self._transaction(
+            meta,
+            book_date,
+            f"Dividends {security}",
+            [
+                _posting(self.cash_account, cashFlow),
+                _posting(dividend_account, -cashFlow),
+            ],
+        )
+
+    def _other_fee(
+        self, row: list[str], meta: data.Meta, book_date: date, proceeds: Decimal
+    ) -> data.Transaction:
+        # Other fees, e.g. referral bonus
+        cashFlow = amount.Amount(proceeds, row[CURRENCY])
+        return self._transaction(
+            meta,
+            book_date,
+            "Other",
+            [
+                _posting(self.cash_account, cashFlow),
+            ],
+        )
+
+    def _interests(
+        self, row: list[str], meta: data.Meta, book_date: date, proceeds: Decimal
+    ) -> data.Transaction:
+        cashFlow = amount.Amount(proceeds, row[CURRENCY])
+        return self._transaction(
+            meta,
+            book_date,
+            "Interests",
+            [
+                _posting(self.cash_account, cashFlow),
+                _posting(self.interests_account, -cashFlow),
+            ],
+        )
+
+    def _fx_exchange(
+        self, row: list[str], meta: data.Meta, book_date: date, proceeds: Decimal
+    ) -> data.Transaction:
+        # Currency pair, e.g. EUR.USD
+        pair = row[SECURITY]
+        base, quote = pair[:3], pair[4:]
+        commission_number = _parse_commission(row[COMMISSION])
+        fx_orig = amount.Amount(D(row[AMOUNT]), base)
+        fx_dest = amount.Amount(proceeds, quote)
+        fx_rate = amount.Amount(D(row[TRADE_PRICE]), quote)
+
+        postings = [
+            data.Posting(self.cash_account, fx_orig, None, fx_rate, None, None),
+            _posting(self.cash_account, fx_dest),
+        ]
+
+        if commission_number != _ZERO:
+            commission = amount.Amount(commission_number, row[COMMISSION_CURRENCY])
+            postings.append(_posting(self.cash_account, commission))
+            postings.append(_posting(self.fees_account, -commission))
+
+        return self._transaction(meta, book_date, f"FX Exchange {pair}", postings)
+
+    def _buy(
+        self, row: list[str], meta: data.Meta, book_date: date, proceeds: Decimal
+    ) -> data.Transaction:
+        # Currency pairs, e.g. EUR.USD, are FX exchanges
+        security = row[SECURITY]
+        if security and "." in security:
+            return self._fx_exchange(row, meta, book_date, proceeds)
+
+        # Parse more fields
+        commission_number = _parse_commission(row[COMMISSION])
+        commission = amount.Amount(commission_number, row[COMMISSION_CURRENCY])
+        shares = amount.Amount(D(row[AMOUNT]), security)
+        cost_per_share = position.CostSpec(
+            number_per=D(row[TRADE_PRICE]),
+            date=None,
+            label=None,
+            merge=None,
+            number_total=None,
+            currency=row[CURRENCY],
+        )
+        cash = amount.Amount(proceeds + commission_number, row[CURRENCY])
+        security_account, _ = self._accounts(security)
+
+        postings = [
+            _posting(self.cash_account, cash),
+            data.Posting(security_account, shares, cost_per_share, None, None, None),
+            _posting(self.fees_account, -commission),
+        ]
+
+        return self._transaction(meta, book_date, f"Buy {security}", postings)
+
+    def _sell(
+        self, row: list[str], meta: data.Meta, book_date: date, proceeds: Decimal
+    ) -> data.Transaction:
+        # Currency pairs, e.g. EUR.USD, are FX exchanges
+        security = row[SECURITY]
+        if security and "." in security:
+            return self._fx_exchange(row, meta, book_date, proceeds)
+
+        shares = amount.Amount(D(row[AMOUNT]), security)
+        price = amount.Amount(D(row[TRADE_PRICE]), row[CURRENCY])
+        commission_number = _parse_commission(row[COMMISSION])
+        commission = amount.Amount(commission_number, row[COMMISSION_CURRENCY])
+        cash = amount.Amount(proceeds + commission_number, row[CURRENCY])
+        security_account, _ = self._accounts(security)
+
+        postings = [
+            # Cash: net proceeds
+            _posting(self.cash_account, cash),
+            # Security: no cost ({}), explicit unit price.
+            data.Posting(
+                security_account,
+                shares,
+                position.CostSpec(
+                    number_per=None,
+                    number_total=None,
+                    currency=None,
+                    date=None,
+                    label=None,
+                    merge=None,
+                ),
+                price,
+                None,
+                None,
+            ),
+            # Fees: negative commission
+            _posting(self.fees_account, -commission),
+            # PnL: negative proceeds
+            _posting(self.pnl_account, None),
+        ]
+
+        return self._transaction(meta, book_date, f"Sell {security}", postings)
+
     def extract(
         self, filepath: str | Any, existing_entries: data.Entries | None = None
     ) -> data.Entries:
         """Extract transactions from an IBKR CSV file."""
-        # Handle both string filepaths and _FileMemo objects from beancount-import
-        path = (
-            getattr(filepath, "filepath", None)
-            or getattr(filepath, "name", None)
-            or getattr(filepath, "filename", None)
-            or str(filepath)
-        )
+        path = self._resolve_path(filepath)
 
         entries: data.Entries = []
 
@@ -72,393 +315,82 @@ class Importer(beangulp.Importer):
         if existing_entries is None:
             existing_entries = []
 
-        withholding_taxes: list[list[Any]] = []
+        withholding_taxes: list[WithholdingTax] = []
+
+        # Dividend transactions by position in entries, with their security
+        dividend_entries: list[tuple[int, str, data.Transaction]] = []
+
+        # Activity report of each year
+        documents: dict[int, str] = {}
 
         try:
-            with open(path, encoding="utf-8") as csvfile:
-                reader = DictReader[str](
-                    csvfile,
-                    fieldnames=[
-                        "Id",
-                        "Date",
-                        "Type",
-                        "Currency",
-                        "Proceeds",
-                        "Security",
-                        "Amount",
-                        "CostBasis",
-                        "TradePrice",
-                        "Commission",
-                        "CommissionCurrency",
-                    ],
-                    delimiter=",",
-                )
-                rows = list[dict[str | Any, str | Any]](reader)
-                for index, row in enumerate[dict[str | Any, str | Any]](rows, start=1):
-                    try:
-                        # Parse
-                        category = row["Type"]
-                        parsed_date = parse(row["Date"].strip())
-                        # dateutil.parser.parse returns datetime, which has .date()
-                        if isinstance(parsed_date, datetime):
-                            book_date = parsed_date.date()
-                        elif isinstance(parsed_date, date):
-                            book_date = parsed_date
-                        else:
-                            # Type narrowing fallback
-                            book_date = date.today()
-                        meta = data.new_metadata(path, index)
-                        meta["document"] = (
-                            f"{book_date.year}-12-31-InteractiveBrokers_"
-                            f"{self.name_account}_"
-                            "ActivityReport.pdf"
+            with open(path, encoding="utf-8", newline="") as csvfile:
+                reader = csv.reader(csvfile, delimiter=",")
+                # Blank lines are skipped and not counted
+                for index, row in enumerate(filter(None, reader), start=1):
+                    if len(row) < COLUMNS:
+                        warnings.warn(
+                            (
+                                f"Error parsing row {index} from file {path}: "
+                                f"expected {COLUMNS} columns, got {len(row)}"
+                            ),
+                            stacklevel=2,
                         )
-                        meta["trans_id"] = row["Id"]
-                        cashFlow = amount.Amount(D(row["Proceeds"]), row["Currency"])
-                        security = row["Security"]
-
-                        # Deposits and withdrawals
-                        if category == "Deposits/Withdrawals":
-                            cash_flow_number = cashFlow.number
-                            narration = (
-                                "Deposit"
-                                if cash_flow_number is not None and cash_flow_number > 0
-                                else "Withdrawal"
-                            )
-                            entries.append(
-                                data.Transaction(
-                                    meta,
-                                    book_date,
-                                    "*",
-                                    "Interactive Brokers",
-                                    narration,
-                                    data.EMPTY_SET,
-                                    data.EMPTY_SET,
-                                    [
-                                        data.Posting(
-                                            self.cash_account,
-                                            cashFlow,
-                                            None,
-                                            None,
-                                            None,
-                                            None,
-                                        )
-                                    ],
-                                )
-                            )
-
-                        # Dividends
-                        elif category == "Dividends":
-                            dividend_account = (
-                                self._income_account + ":" + security + ":Dividends"
-                            )
-                            entries.append(
-                                data.Transaction(
-                                    meta,
-                                    book_date,
-                                    "*",
-                                    "Interactive Brokers",
-                                    f"Dividends {security}",
-                                    data.EMPTY_SET,
-                                    data.EMPTY_SET,
-                                    [
-                                        data.Posting(
-                                            self.cash_account,
-                                            cashFlow,
-                                            None,
-                                            None,
-                                            None,
-                                            None,
-                                        ),
-                                        data.Posting(
-                                            dividend_account,
-                                            -cashFlow,
-                                            None,
-                                            None,
-                                            None,
-                                            None,
-                                        ),
-                                    ],
-                                )
-                            )
+                        continue
 
-                        # Other fees, e.g. referral bonus
-                        elif category == "Other Fees":
-                            entries.append(
-                                data.Transaction(
-                                    meta,
-                                    book_date,
-                                    "*",
-                                    "Interactive Brokers",
-                                    "Other",
-                                    data.EMPTY_SET,
-                                    data.EMPTY_SET,
-                                    [
-                                        data.Posting(
-                                            self.cash_account,
-                                            cashFlow,
-                                            None,
-                                            None,
-                                            None,
-                                            None,
-                                        ),
-                                    ],
-                                )
+                    try:
+                        # Parse
+                        category = row[TYPE]
+                        book_date = parse_date(row[DATE].strip())
+                        document = documents.get(book_date.year)
+                        if document is None:
+                            document = documents[book_date.year] = (
+                                f"{book_date.year}-12-31-InteractiveBrokers_"
+                                f"{self.name_account}_"
+                                "ActivityReport.pdf"
                             )
-
-                        # Withholding tax
-                        elif category == "Withholding Tax":
+                        # Same keys as data.new_metadata(), built in one go
+                        meta = {
+                            "filename": path,
+                            "lineno": index,
+                            "document": document,
+                            "trans_id": row[ID],
+                        }
+                        proceeds_number = D(row[PROCEEDS])
+
+                        # Withholding taxes are merged into their dividends
+                        if category == "Withholding Tax":
                             withholding_taxes.append(
-                                [security, book_date, cashFlow, False, meta]
-                            )
-
-                        # Interests
-                        elif category == "Broker Interest Received":
-                            entries.append(
-                                data.Transaction(
-                                    meta,
-                                    book_date,
-                                    "*",
-                                    "Interactive Brokers",
-                                    "Interests",
-                                    data.EMPTY_SET,
-                                    data.EMPTY_SET,
-                                    [
-                                        data.Posting(
-                                            self.cash_account,
-                                            cashFlow,
-                                            None,
-                                            None,
-                                            None,
-                                            None,
-                                        ),
-                                        data.Posting(
-                                            self.interests_account,
-                                            -cashFlow,
-                                            None,
-                                            None,
-                                            None,
-                                            None,
-                                        ),
-                                    ],
-                                )
-                            )
-
-                        # FX Exchange
-                        elif (
-                            category in ["BUY", "SELL"] and security and "." in security
-                        ):
-                            commission = amount.Amount(
-                                D(row["Commission"]), row["CommissionCurrency"]
-                            )
-                            fx_orig = amount.Amount(
-                                D(row["Amount"]), row["Security"][:3]
-                            )
-                            fx_dest = amount.Amount(
-                                D(row["Proceeds"]), row["Security"][4:]
-                            )
-                            fx_rate = amount.Amount(
-                                D(row["TradePrice"]), row["Security"][4:]
-                            )
-
-                            postings = [
-                                data.Posting(
-                                    self.cash_account,
-                                    fx_orig,
-                                    None,
-                                    fx_rate,
-                                    None,
-                                    None,
-                                ),
-                                data.Posting(
-                                    self.cash_account,
-                                    fx_dest,
-                                    None,
-                                    None,
-                                    None,
-                                    None,
-                                ),
-                            ]
-
-                            if commission.number != 0:
-                                postings.append(
-                                    data.Posting(
-                                        self.cash_account,
-                                        commission,
-                                        None,
-                                        None,
-                                        None,
-                                        None,
-                                    )
-                                )
-                                postings.append(
-                                    data.Posting(
-                                        self.fees_account,
-                                        -commission,
-                                        None,
-                                        None,
-                                        None,
-                                        None,
-                                    )
-                                )
-
-                            entries.append(
-                                data.Transaction(
-                                    meta,
-                                    book_date,
-                                    "*",
-                                    "Interactive Brokers",
-                                    f"FX Exchange {row['Security']}",
-                                    data.EMPTY_SET,
-                                    data.EMPTY_SET,
-                                    postings,
-                                )
-                            )
-
-                        # Trade: buy
-                        elif category == "BUY":
-                            # Parse more fields
-                            commission = amount.Amount(
-                                D(row["Commission"]), row["CommissionCurrency"]
-                            )
-                            shares = amount.Amount(D(row["Amount"]), security)
-                            cost_per_share = position.CostSpec(
-                                number_per=D(row["TradePrice"]),
-                                date=None,
-                                label=None,
-                                merge=None,
-                                number_total=None,
-                                currency=row["Currency"],
-                            )
-                            proceeds = amount.Amount(
-                                D(row["Proceeds"]) + D(row["Commission"]),
-                                row["Currency"],
-                            )
-                            security_account = self._parent_account + ":" + security
-
-                            postings = [
-                                data.Posting(
-                                    self.cash_account,
-                                    proceeds,
-                                    None,
-                                    None,
-                                    None,
-                                    None,
-                                ),
-                                data.Posting(
-                                    security_account,
-                                    shares,
-                                    cost_per_share,
-                                    None,
-                                    None,
-                                    None,
-                                ),
-                                data.Posting(
-                                    self.fees_account,
-                                    -commission,
-                                    None,
-                                    None,
-                                    None,
-                                    None,
-                                ),
-                            ]
-
-                            entries.append(
-                                data.Transaction(
-                                    meta,
+                                WithholdingTax(
+                                    row[SECURITY],
                                     book_date,
-                                    "*",
-                                    "Interactive Brokers",
-                                    f"Buy {row['Security']}",
-                                    data.EMPTY_SET,
-                                    data.EMPTY_SET,
-                                    postings,
-                                )
-                            )
-
-                        # Trade: sell
-                        elif category == "SELL":
-                            shares = amount.Amount(D(row["Amount"]), security)
-                            price = amount.Amount(D(row["TradePrice"]), row["Currency"])
-                            commission = amount.Amount(
-                                D(row["Commission"]), row["CommissionCurrency"]
-                            )
-                            proceeds = amount.Amount(
-                                D(row["Proceeds"]) + D(row["Commission"]),
-                                row["Currency"],
-                            )
-                            security_account = self._parent_account + ":" + security
-
-                            postings = [
-                                # Cash: net proceeds
-                                data.Posting(
-                                    self.cash_account,
-                                    proceeds,
-                                    None,
-                                    None,
-                                    None,
-                                    None,
-                                ),
-                                # Security: no cost ({}), explicit unit price.
-                                data.Posting(
-                                    security_account,
-                                    shares,
-                                    position.CostSpec(
-                                        number_per=None,
-                                        number_total=None,
-                                        currency=None,
-                                        date=None,
-                                        label=None,
-                                        merge=None,
-                                    ),
-                                    price,
-                                    None,
-                                    None,
-                                ),
-                                # Fees: negative commission
-                                data.Posting(
-                                    self.fees_account,
-                                    -commission,
-                                    None,
-                                    None,
-                                    None,
-                                    None,
-                                ),
-                                # PnL: negative proceeds
-                                data.Posting(
-                                    self.pnl_account,
-                                    None,
-                                    None,
-                                    None,
-                                    None,
-                                    None,
-                                ),
-                            ]
-
-                            entries.append(
-                                data.Transaction(
+                                    proceeds_number,
+                                    row[CURRENCY],
                                     meta,
-                                    book_date,
-                                    "*",
-                                    "Interactive Brokers",
-                                    f"Sell {row['Security']}",
-                                    data.EMPTY_SET,
-                                    data.EMPTY_SET,
-                                    postings,
                                 )
                             )
+                            continue
 
                         # Unrecognized transaction
-                        else:
+                        handler = self._handlers.get(category)
+                        if handler is None:
                             warnings.warn(
                                 (
                                     f"File {path}: unsupported transaction of type "
-                                    f"{category} on {row['Date']}"
+                                    f"{category} on {row[DATE]}"
                                 ),
                                 stacklevel=2,
                             )
+                            continue
+
+                        transaction = handler(row, meta, book_date, proceeds_number)
+                        entries.append(transaction)
+                        if category == "Dividends":
+                            dividend_entries.append(
+                                (len(entries) - 1, row[SECURITY], transaction)
+                            )
 
-                    except (ValueError, KeyError, IndexError) as e:
+                    except ValueError as e:
                         warnings.warn(
                             (f"Error parsing row {index} from file {path}: {e}"),
                             stacklevel=2,
@@ -472,29 +404,24 @@ class Importer(beangulp.Importer):
             )
             return entries
 
-        # Append withholding taxes
-        for index, entry in enumerate[Directive](entries):
-            # It is a transaction
-            if not isinstance(entry, data.Transaction):
-                continue
-
-            # It is a dividend transaction
-            if entry.narration is None or "Dividends" not in entry.narration:
-                continue
+        # Withholding taxes by security and date
+        matched_taxes = [False] * len(withholding_taxes)
+        taxes_by_dividend: dict[tuple[str, date], list[int]] = {}
+        for index, tax in enumerate(withholding_taxes):
+            taxes_by_dividend.setdefault((tax.security, tax.date), []).append(index)
 
-            # Get date and security
-            trans_date = entry.date
-            security = entry.narration.replace("Dividends ", "")
+        # Append withholding taxes
+        merged_dividends: list[tuple[str, data.Transaction]] = []
+        for index, security, dividend in dividend_entries:
+            trans_date = dividend.date
 
             # Find withholding tax
             matched = False
-            for index2, tax in enumerate[list[Any]](withholding_taxes):
-                # Match
-                if tax[0] != security or tax[1] != trans_date:
-                    continue
+            for index2 in taxes_by_dividend.get((security, trans_date), ()):
+                tax = withholding_taxes[index2]
 
                 # Double processing?
-                if tax[3]:
+                if matched_taxes[index2]:
                     warnings.warn(
                         (
                             f"Double match withholding tax for {security} "
@@ -503,11 +430,11 @@ class Importer(beangulp.Importer):
                         stacklevel=2,
                     )
                 else:
-                    withholding_taxes[index2][3] = True
+                    matched_taxes[index2] = True
 
                 # Build new postings
-                tax_amount = tax[2]
-                posting_units = entry.postings[0].units
+                tax_amount = tax.value
+                posting_units = dividend.postings[0].units
                 if (
                     tax_amount.number is None
                     or posting_units is None
@@ -519,38 +446,19 @@ class Importer(beangulp.Importer):
                     )
                     continue
                 total_cash_flow = amount.Amount(
-                    D(tax_amount.number + posting_units.number), tax_amount.currency
+                    tax_amount.number + posting_units.number, tax_amount.currency
                 )
-                entries[index] = data.Transaction(
-                    entry.meta,
-                    entry.date,
-                    entry.flag,
-                    entry.payee,
-                    entry.narration,
-                    entry.tags,
-                    entry.links,
-                    [
-                        data.Posting(
-                            self.cash_account,
-                            total_cash_flow,
-                            None,
-                            None,
-                            None,
-                            None,
-                        ),
-                        entry.postings[1],
-                        data.Posting(
-                            self.tax_account + ":" + tax[2].currency,
-                            -tax[2],
-                            None,
-                            None,
-                            None,
-                            None,
-                        ),
+                dividend = dividend._replace(
+                    postings=[
+                        _posting(self.cash_account, total_cash_flow),
+                        dividend.postings[1],
+                        _posting(self.tax_account + ":" + tax.currency, -tax.value),
                     ],
                 )
+                entries[index] = dividend
                 matched = True
                 break
+            merged_dividends.append((security, dividend))
 
             # Withholding tax not found
             if not matched:
@@ -560,106 +468,96 @@ class Importer(beangulp.Importer):
                 )
 
         # All withholding taxes processed?
-        unmatched_withholding_taxes = []
-        for tax in withholding_taxes:
-            if not tax[3]:
-                unmatched_withholding_taxes.append(tax)
+        unmatched_withholding_taxes = [
+            tax
+            for tax, matched in zip(withholding_taxes, matched_taxes, strict=True)
+            if not matched
+        ]
 
         # Withholding tax re-calculations
-        indexes: list[int] = []
-        for index, tax in enumerate[list[Any]](unmatched_withholding_taxes):
+        indexes: set[int] = set()
+        charges: dict[str, list[int]] = {}
+        for index, tax in enumerate(unmatched_withholding_taxes):
+            if tax.number < 0:
+                charges.setdefault(tax.security, []).append(index)
+        dividends: dict[tuple[str, amount.Amount], list[data.Transaction]] | None = None
+        for index, tax in enumerate(unmatched_withholding_taxes):
             # Check for tax re-imbursement
-            if tax[2].number > 0:
-                # Find tax re-calculations on same date
-                for index2, match_tax in enumerate[list[Any]](
-                    unmatched_withholding_taxes
-                ):
-                    if match_tax[0:1] == tax[0:1] and match_tax[2].number < 0:
-                        # Find original dividend
-                        for entry in itertools.chain(entries, existing_entries):
-                            # It is a transaction
-                            if not isinstance(entry, data.Transaction):
-                                continue
-
-                            # It is a dividend transaction
-                            if (
-                                entry.narration is None
-                                or "Dividends" not in entry.narration
-                            ):
-                                continue
-
-                            # It is the same security
-                            security = entry.narration.replace("Dividends ", "")
-                            if security != tax[0]:
-                                continue
-                            dividend_account = (
-                                self._income_account + ":" + security + ":Dividends"
-                            )
-
-                            # It is the same value, opposite sign
-                            value = None
-                            for posting in entry.postings:
-                                if posting.account == self.tax_account:
-                                    value = posting.units
-                            if value is None or value != tax[2]:
-                                continue
-
-                            # We got a match! Get date of original dividend payout
-                            trans_date = entry.date
-                            indexes.append(index)
-                            indexes.append(index2)
-                            cash_balance = amount.Amount(
-                                tax[2].number + match_tax[2].number, tax[2].currency
-                            )
-
-                            entries.append(
-                                data.Transaction(
-                                    tax[4],
-                                    tax[1],
-                                    "*",
-                                    "Interactive Brokers",
-                                    f"Dividends {security}",
-                                    data.EMPTY_SET,
-                                    data.EMPTY_SET,
-                                    [
-                                        data.Posting(
-                                            self.cash_account,
-                                            cash_balance,
-                                            None,
-                                            None,
-                                            None,
-                                            None,
-                                        ),
-                                        data.Posting(
-                                            dividend_account,
-                                            amount.Amount(D("0"), tax[2].currency),
-                                            None,
-                                            None,
-                                            None,
-                                            None,
-                                        ),
-                                        data.Posting(
-                                            (
-                                                self.tax_account
-                                                + ":"
-                                                + cash_balance.currency
-                                            ),
-                                            -cash_balance,
-                                            None,
-                                            None,
-                                            None,
-                                            {"effective_date": f"{trans_date}"},
-                                        ),
-                                    ],
-                                )
+            if tax.number > 0:
+                # Dividend transactions by security and withholding tax value,
+                # indexed on first use
+                if dividends is None:
+                    dividends = {}
+                    previous_dividends = (
+                        (entry.narration.replace("Dividends ", ""), entry)
+                        for entry in existing_entries
+                        if isinstance(entry, data.Transaction)
+                        and entry.narration is not None
+                        and "Dividends" in entry.narration
+                    )
+                    for security, entry in itertools.chain(
+                        merged_dividends, previous_dividends
+                    ):
+                        value = None
+                        for posting in entry.postings:
+                            if posting.account == self.tax_account:
+                                value = posting.units
+                        if value is None:
+                            continue
+                        dividends.setdefault((security, value), []).append(entry)
+
+                # Original dividends with the same value, opposite sign
+                security = tax.security
+                originals = dividends.get((security, tax.value))
+                if not originals:
+                    continue
+                _, dividend_account = self._accounts(security)
+                no_dividend = amount.Amount(_ZERO, tax.currency)
+
+                # Find tax re-calculations of the same security
+                for index2 in charges.get(security, ()):
+                    match_tax = unmatched_withholding_taxes[index2]
+                    cash_balance = amount.Amount(
+                        tax.number + match_tax.number, tax.currency
+                    )
+                    tax_account = self.tax_account + ":" + cash_balance.currency
+                    tax_balance = -cash_balance
+                    for entry in originals:
+                        # We got a match! Get date of original dividend payout
+                        trans_date = entry.date
+                        indexes.add(index)
+                        indexes.add(index2)
+
+                        entries.append(
+                            data.Transaction(
+                                tax.meta,
+                                tax.date,
+                                "*",
+                                "Interactive Brokers",
+                                f"Dividends {security}",
+                                data.EMPTY_SET,
+                                data.EMPTY_SET,
+                                [
+                                    _posting(self.cash_account, cash_balance),
+                                    _posting(dividend_account, no_dividend),
+                                    data.Posting(
+                                        tax_account,
+                                        tax_balance,
+                                        None,
+                                        None,
+                                        None,
+                                        {"effective_date": f"{trans_date}"},
+                                    ),
+                                ],
                             )
+                        )
 
         # Unmatched withholding taxes?
-        for index, tax in enumerate[list[Any]](unmatched_withholding_taxes):
+        for index, tax in enumerate(unmatched_withholding_taxes):
             if index not in indexes:
                 logging.warning(
-                    f"Unmatched withholding tax for {tax[0]} on {tax[1]}, "
-                    f"value {tax[2]}"
+                    f"Unmatched withholding tax for {tax.security} on {tax.date}, "
+                    f"value {tax.value}"
                 )
 
         return entries
@@ -3,7 +3,6 @@ import datetime
 import os
 import re
 import warnings
-from datetime import date as date_type
 from decimal import Decimal
 from enum import Enum
 from typing import Any
@@ -11,7 +10,8 @@ from typing import Any
 import beangulp
 from beancount.core import amount, data
 from beancount.core.number import D
-from dateutil.parser import parse
+
+from ._dates import parse_date
 
 
 class TransactionType(Enum):
@@ -79,13 +79,7 @@ class Transaction:
             info["Details"].strip().lower(), self.value
         )
         if self.type != TransactionType.Repurchase:
-            parsed_date = parse(info["Date"].strip())
-            if isinstance(parsed_date, datetime.datetime):
-                self.date = parsed_date.date()
-            elif isinstance(parsed_date, date_type):
-                self.date = parsed_date
-            else:
-                self.date = date_type.today()
+            self.date = parse_date(info["Date"].strip())
 
 
 class Importer(beangulp.Importer):
@@ -1,13 +1,13 @@
 import csv
 import re
 import warnings
-from datetime import date, datetime
 from typing import Any
 
 import beangulp
 from beancount.core import amount, data
 from beancount.core.number import D
-from dateutil.parser import parse
+
+from ._dates import parse_date
 
 
 class Importer(beangulp.Importer):
@@ -69,13 +69,7 @@ class Importer(beangulp.Importer):
             try:
                 # Parse transaction
                 meta = data.new_metadata(path, index)
-                parsed_date = parse(row["Date"].strip())
-                if isinstance(parsed_date, datetime):
-                    book_date = parsed_date.date()
-                elif isinstance(parsed_date, date):
-                    book_date = parsed_date
-                else:
-                    book_date = date.today()
+                book_date = parse_date(row["Date"].strip())
                 amt = amount.Amount(D(row["Amount"]), "CHF")
                 metakv = {
                     "category": row["Category"],
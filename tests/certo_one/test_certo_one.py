@@ -10,7 +10,11 @@ import pytest
 from beancount.core import amount, data
 from beancount.core.number import D
 
-from beancount_importers.importers.certo_one import Importer, parse_pdf_to_csv
+from beancount_importers.importers.certo_one import (
+    Importer,
+    parse_pdf_to_csv,
+    prewarm_csvs,
+)
 
 
 class TestCertoOneImporter:
@@ -279,6 +283,9 @@ class TestCertoOneImporter:
             assert entry.meta["filename"] == sample_pdf_file
             assert entry.meta["lineno"] == 0  # All entries use lineno 0
 
+        # Each entry has its own metadata, which beangulp may update in place
+        assert len({id(entry.meta) for entry in entries}) == len(entries)
+
     def test_extract_with_existing_entries(
         self, importer: Importer, sample_pdf_file: str, csv_cleanup: None
     ) -> None:
@@ -363,6 +370,32 @@ class TestCertoOneImporter:
             assert transaction.payee == "ETH Mensa"
             assert transaction.narration == "Lunch"
 
+    def test_narration_map_order(self) -> None:
+        """Test that the first matching pattern wins, not the leftmost match."""
+        narration_maps = [
+            {
+                "Zürich": ("City", "Zurich"),
+                "^Coop": ("Coop", "Groceries"),
+            },
+            # Patterns that cannot be combined into a single regex
+            {
+                "Zürich": ("City", "Zurich"),
+                "^Coop": ("Coop", "Groceries"),
+                "(?i)migros": ("Migros", "Groceries"),
+                r"(\d+)x": ("Multi", "Items"),
+            },
+        ]
+        for narration_map in narration_maps:
+            importer = Importer(
+                r"CertoOne.*\.pdf$", "Assets:CertoOne:Main", narration_map=narration_map
+            )
+            assert importer._narrate("Coop Zürich") == ("City", "Zurich")
+            assert importer._narrate("Coop Basel") == ("Coop", "Groceries")
+            assert importer._narrate("Basel Coop") == ("", "Basel Coop")
+
+        assert importer._narrate("MIGROS Basel") == ("Migros", "Groceries")
+        assert importer._narrate("Kiosk 3x") == ("Multi", "Items")
+
 
 class TestCertoOnePDFParsing:
     """Test PDF parsing functionality."""
@@ -511,6 +544,44 @@ class TestCertoOnePDFParsing:
             # Verify that a CSV file was created (even if empty or minimal)
             assert os.path.exists(csv_file)
 
+    def test_parse_pdf_single_digit_dates(self) -> None:
+        """Test PDF parsing of booking dates without leading zeros."""
+        import unittest.mock
+
+        import pandas as pd
+
+        table = unittest.mock.MagicMock()
+        table.df = pd.DataFrame(
+            [
+                ["1.2.2025", "Coop", "", "10.50"],
+                ["15.02.2025", "Ihre Zahlung", "206.85", ""],
+                ["", "Übertrag", "", ""],
+            ]
+        )
+        with (
+            unittest.mock.patch(
+                "beancount_importers.importers.certo_one.PdfReader"
+            ) as mock_reader,
+            unittest.mock.patch(
+                "beancount_importers.importers.certo_one.camelot.read_pdf",
+                return_value=[table],
+            ),
+            tempfile.TemporaryDirectory() as temp_dir,
+        ):
+            mock_reader.return_value.pages = [None] * 4
+            csv_file = os.path.join(temp_dir, "SingleDigit_Test.csv")
+
+            parse_pdf_to_csv("statement.pdf", csv_file)
+
+            with open(csv_file) as f:
+                lines = f.read().splitlines()
+
+        assert lines == [
+            "Date;Amount;Description",
+            "2025-02-01;-10.50;Coop",
+            "2025-02-15;206.85;Ihre Zahlung",
+        ]
+
     def test_parse_pdf_invalid_file(self) -> None:
         """Test PDF parsing with invalid file."""
         # Use temporary directory for files
@@ -615,6 +686,80 @@ class TestCertoOneImporterIntegration:
             if csv_file.exists():
                 csv_file.unlink()
 
+    def test_stale_csv_file_regenerated(self, importer: Importer) -> None:
+        """Test that a CSV file older than its PDF file is regenerated."""
+        pdf_file = "tests/certo_one/CertoOne_Sample.pdf"
+
+        if not os.path.exists(pdf_file):
+            pytest.skip(f"Test file {pdf_file} not found")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_pdf = Path(temp_dir) / "CertoOne_Sample.pdf"
+            temp_pdf.write_bytes(Path(pdf_file).read_bytes())
+
+            # Outdated CSV file from an earlier version of the statement
+            csv_file = temp_pdf.with_suffix(".csv")
+            csv_file.write_text(
+                "Date;Amount;Description\n2025-01-01;0;BALANCE\n2025-01-01;1;Old\n"
+            )
+            pdf_mtime = temp_pdf.stat().st_mtime
+            os.utime(csv_file, (pdf_mtime - 60, pdf_mtime - 60))
+
+            entries = importer.extract(str(temp_pdf), [])
+            assert len(entries) == 21
+            assert "Old" not in csv_file.read_text()
+
+    def test_prewarm_csvs(self, importer: Importer) -> None:
+        """Test parsing several statements to CSV files ahead of extraction."""
+        pdf_files = [
+            "tests/certo_one/CertoOne_Sample.pdf",
+            "tests/certo_one/CertoOne_Sample2.pdf",
+        ]
+
+        for pdf_file in pdf_files:
+            if not os.path.exists(pdf_file):
+                pytest.skip(f"Test file {pdf_file} not found")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_pdfs = []
+            for pdf_file in pdf_files:
+                temp_pdf = Path(temp_dir) / Path(pdf_file).name
+                temp_pdf.write_bytes(Path(pdf_file).read_bytes())
+                temp_pdfs.append(str(temp_pdf))
+
+            prewarm_csvs(temp_pdfs, max_workers=2)
+
+            csv_files = [Path(pdf).with_suffix(".csv") for pdf in temp_pdfs]
+            assert all(csv_file.exists() for csv_file in csv_files)
+            mtimes = [csv_file.stat().st_mtime for csv_file in csv_files]
+
+            # Up-to-date CSV files are neither regenerated nor rewritten
+            prewarm_csvs(temp_pdfs)
+            entries = importer.extract(temp_pdfs[0], [])
+            assert len(entries) == 21
+            assert [csv_file.stat().st_mtime for csv_file in csv_files] == mtimes
+
+    def test_csv_file_date_formats(self, importer: Importer) -> None:
+        """Test reading a CSV file with dates in other formats."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pdf_file = os.path.join(temp_dir, "CertoOne_Legacy.pdf")
+            Path(pdf_file).with_suffix(".csv").write_text(
+                "Date;Amount;Description\n"
+                "2025-10-24;540.15;BALANCE\n"
+                "07.10.2025;206.85;Ihre Zahlung\n"
+                "Oct 8 2025;-10.50;Coop\n"
+                "1.2.2025;-4.20;Migros\n"
+            )
+
+            entries = importer.extract(pdf_file, [])
+
+            assert [entry.date for entry in entries] == [
+                date(2025, 10, 24),
+                date(2025, 10, 7),
+                date(2025, 10, 8),
+                date(2025, 2, 1),
+            ]
+
     def test_compare_with_expected_structure(self, importer: Importer) -> None:
         """Test that extracted entries match expected structure."""
         pdf_file = "tests/certo_one/CertoOne_Sample.pdf"
@@ -1,10 +1,13 @@
 """Tests for the Telegram downloader CLI tool."""
 
+import asyncio
 import csv
+import io
 import os
 import sys
 import tempfile
 from argparse import Namespace
+from collections.abc import Generator
 from datetime import datetime
 from pathlib import Path
 from typing import Any
@@ -19,12 +22,19 @@ sys.modules["camelot"] = MagicMock()
 sys.modules["pypdf"] = MagicMock()
 
 from beancount_importers.cli.telegram_downloader import (  # noqa: E402
+    AttachmentDownloader,
     AttachmentPattern,
     ParseAttachmentPattern,
     ParseDict,
+    TransactionWriter,
     build_file_name,
     check_connection,
+    ensure_directory,
+    find_last_message_id,
     main,
+    parse_attachment_date,
+    parse_transaction_date,
+    read_last_message_id,
 )
 
 
@@ -60,6 +70,19 @@ class TestAttachmentPattern:
         assert "*.pdf" in str_repr
         assert "receipt" in str_repr
 
+    def test_matches(self) -> None:
+        """Test matching filenames against the glob pattern."""
+        pattern = AttachmentPattern(
+            account="Assets:Cash",
+            pattern="receipt_*.pdf",
+            skip_init=8,
+            skip_end=16,
+            name="receipt",
+        )
+        assert pattern.matches("receipt_20240115_123456.pdf")
+        assert not pattern.matches("receipt_20240115_123456.jpg")
+        assert not pattern.matches("invoice_20240115.pdf")
+
 
 class TestParseAttachmentPattern:
     """Tests for ParseAttachmentPattern action."""
@@ -187,6 +210,211 @@ class TestParseDict:
         assert namespace.account_map == {"Cash": "Assets:Cash:CHF"}
 
 
+class TestTransactionWriter:
+    """Tests for TransactionWriter class."""
+
+    FIELDNAMES = ["id", "account", "amount"]
+
+    def test_header_written_once(self) -> None:
+        """Test that entries for the same file share a single header."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, "out.csv")
+            with TransactionWriter(self.FIELDNAMES) as writer:
+                writer.add(filename, ("1", "Cash", "1.00"))
+                writer.add(filename, ("2", "Cash", "2.00"))
+
+            with open(filename, encoding="utf-8") as f:
+                rows = list(csv.DictReader(f, delimiter=";"))
+            assert [row["id"] for row in rows] == ["1", "2"]
+
+    def test_append_to_existing_file(self) -> None:
+        """Test that existing files are appended to without a new header."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, "out.csv")
+            with TransactionWriter(self.FIELDNAMES) as writer:
+                writer.add(filename, ("1", "Cash", "1.00"))
+            with TransactionWriter(self.FIELDNAMES) as writer:
+                writer.add(filename, ("2", "Cash", "2.00"))
+
+            with open(filename, encoding="utf-8") as f:
+                rows = list(csv.DictReader(f, delimiter=";"))
+            assert [row["id"] for row in rows] == ["1", "2"]
+
+    def test_output_matches_csv_writer(self) -> None:
+        """Test that plain and quoted rows match csv.writer output."""
+        entries = [
+            ("1", "Cash", "1.00"),
+            ("2", 'Say "hi"', "a;b"),
+            ("3", "line\nbreak", ""),
+        ]
+        expected = io.StringIO()
+        reference = csv.writer(expected, delimiter=";")
+        reference.writerow(self.FIELDNAMES)
+        reference.writerows(entries)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, "out.csv")
+            with TransactionWriter(self.FIELDNAMES) as writer:
+                for entry in entries:
+                    writer.add(filename, entry)
+
+            with open(filename, encoding="utf-8", newline="") as f:
+                assert f.read() == expected.getvalue()
+
+
+class TestParseDates:
+    """Tests for date parsing helpers."""
+
+    def test_parse_transaction_date(self) -> None:
+        """Test parsing transaction dates."""
+        assert parse_transaction_date("2024-01-15") == "2024-01-15"
+        assert parse_transaction_date(" 2024/01/15 ") == "2024-01-15"
+        # Formats without a fast path fall back to dateutil
+        assert parse_transaction_date("15 Jan 2024") == "2024-01-15"
+        assert parse_transaction_date("01.02.2024") == "2024-01-02"
+
+    def test_parse_transaction_date_invalid(self) -> None:
+        """Test parsing an invalid transaction date."""
+        with pytest.raises(ValueError):
+            parse_transaction_date("not a date")
+
+    def test_parse_attachment_date(self) -> None:
+        """Test parsing attachment dates."""
+        assert parse_attachment_date("20240115") == "2024-01-15"
+        assert parse_attachment_date("2024-01-15") == "2024-01-15"
+        assert parse_attachment_date("2024-01") == "2024-01-01"
+
+    def test_parse_attachment_date_invalid(self) -> None:
+        """Test parsing an invalid attachment date."""
+        with pytest.raises(ValueError):
+            parse_attachment_date("2024011X")
+
+
+class TestAttachmentDownloader:
+    """Tests for AttachmentDownloader class."""
+
+    @pytest.fixture
+    def mock_client(self) -> Generator[Any, None, None]:
+        """Create a mock client with a real event loop."""
+        client = MagicMock()
+        client.loop = asyncio.new_event_loop()
+        client.in_flight = 0
+        client.max_in_flight = 0
+
+        async def download_media(message: Any, file: str) -> str:
+            client.in_flight += 1
+            client.max_in_flight = max(client.max_in_flight, client.in_flight)
+            await asyncio.sleep(0)
+            client.in_flight -= 1
+            if message == "broken":
+                raise OSError("Download failed")
+            if message == "flood":
+                raise RuntimeError("Flood wait")
+            return file
+
+        client.download_media = download_media
+        yield client
+        client.loop.close()
+
+    def test_downloads_on_exit(self, mock_client: Any) -> None:
+        """Test that queued downloads run when leaving the context."""
+        with patch("builtins.print") as mock_print:
+            with AttachmentDownloader(mock_client, max_parallel=2) as downloader:
+                for index in range(5):
+                    downloader.add(f"msg{index}", f"/tmp/file{index}.pdf")
+                mock_print.assert_not_called()
+
+        printed = [call.args[0] for call in mock_print.call_args_list]
+        assert printed == [f"File downloaded: /tmp/file{i}.pdf" for i in range(5)]
+        assert mock_client.max_in_flight == 2
+
+    def test_batch_size_triggers_flush(self, mock_client: Any) -> None:
+        """Test that reaching the batch size downloads queued attachments."""
+        downloader = AttachmentDownloader(mock_client, batch_size=2)
+        with patch("builtins.print") as mock_print:
+            downloader.add("msg1", "/tmp/file1.pdf")
+            mock_print.assert_not_called()
+            downloader.add("msg2", "/tmp/file2.pdf")
+            assert mock_print.call_count == 2
+
+    def test_downloads_on_error(self, mock_client: Any) -> None:
+        """Test that queued downloads still run when leaving on an error."""
+        with patch("builtins.print") as mock_print:
+            with pytest.raises(ConnectionError):
+                with AttachmentDownloader(mock_client) as downloader:
+                    downloader.add("msg", "/tmp/file.pdf")
+                    raise ConnectionError
+
+        mock_print.assert_called_once_with("File downloaded: /tmp/file.pdf")
+
+    def test_no_downloads_on_interrupt(self, mock_client: Any) -> None:
+        """Test that no downloads are started after an interrupt."""
+        with patch("builtins.print") as mock_print:
+            with pytest.raises(KeyboardInterrupt):
+                with AttachmentDownloader(mock_client) as downloader:
+                    downloader.add("msg", "/tmp/file.pdf")
+                    raise KeyboardInterrupt
+
+        mock_print.assert_not_called()
+
+    def test_failed_download(self, mock_client: Any) -> None:
+        """Test that a failed download is reported without stopping others."""
+        with patch("builtins.print") as mock_print:
+            with AttachmentDownloader(mock_client) as downloader:
+                downloader.add("broken", "/tmp/broken.pdf")
+                downloader.add("msg", "/tmp/file.pdf")
+
+        printed = [call.args[0] for call in mock_print.call_args_list]
+        assert printed[0].startswith("Warning: Failed to download /tmp/broken.pdf")
+        assert printed[1] == "File downloaded: /tmp/file.pdf"
+
+    def test_download_error_raised(self, mock_client: Any) -> None:
+        """Test that a Telegram error is raised after the batch completes."""
+        with patch("builtins.print") as mock_print:
+            with pytest.raises(RuntimeError, match="Flood wait"):
+                with AttachmentDownloader(mock_client) as downloader:
+                    downloader.add("flood", "/tmp/flood.pdf")
+                    downloader.add("msg", "/tmp/file.pdf")
+
+        mock_print.assert_called_once_with("File downloaded: /tmp/file.pdf")
+
+    def test_directory_listed_once(self, mock_client: Any) -> None:
+        """Test that a directory is only listed on the first lookup."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            downloader = AttachmentDownloader(mock_client)
+            with patch(
+                "beancount_importers.cli.telegram_downloader.scandir",
+                wraps=os.scandir,
+            ) as mock_scandir:
+                for index in range(3):
+                    downloader.is_taken(os.path.join(temp_dir, f"file{index}.pdf"))
+                assert mock_scandir.call_count == 1
+
+    def test_queued_destination_is_taken(self, mock_client: Any) -> None:
+        """Test that queued destinations are reported as taken."""
+        downloader = AttachmentDownloader(mock_client)
+        assert not downloader.is_taken("/tmp/does-not-exist.pdf")
+        downloader.add("msg", "/tmp/does-not-exist.pdf")
+        assert downloader.is_taken("/tmp/does-not-exist.pdf")
+
+    def test_unique_name(self, mock_client: Any) -> None:
+        """Test numbering of duplicate destinations."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, "scan.jpeg")
+            downloader = AttachmentDownloader(mock_client)
+            assert downloader.unique_name(filename) == filename
+
+            Path(filename).touch()
+            downloader = AttachmentDownloader(mock_client)
+            second = downloader.unique_name(filename)
+            assert second == os.path.join(temp_dir, "scan_2.jpeg")
+
+            downloader.add("msg", second)
+            assert downloader.unique_name(filename) == os.path.join(
+                temp_dir, "scan_3.jpeg"
+            )
+
+
 class TestBuildFileName:
     """Tests for build_file_name function."""
 
@@ -202,6 +430,17 @@ class TestBuildFileName:
         assert "_Transactions_TelegramBot.csv" in filename
         assert "Assets/Cash/CHF" in filename or "Assets" in filename
 
+    def test_build_file_name_trailing_slash(self) -> None:
+        """Test building file name with a trailing slash in the root folder."""
+        args = Namespace()
+        args.account_map = {"My Cash": "Assets:Cash:CHF"}
+        args.root_folder = "/tmp/records/"
+
+        filename = build_file_name("My Cash", "2024", args)
+        assert filename == (
+            "/tmp/records/Assets/Cash/CHF/2024-12-31-MyCash_Transactions_TelegramBot.csv"
+        )
+
     def test_build_file_name_missing_account(self) -> None:
         """Test building file name with missing account."""
         args = Namespace()
@@ -212,6 +451,121 @@ class TestBuildFileName:
             build_file_name("MissingAccount", "2024", args)
 
 
+class TestEnsureDirectory:
+    """Tests for ensure_directory function."""
+
+    def test_creates_directory_once(self) -> None:
+        """Test that a directory is only created the first time."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            directory = os.path.join(temp_dir, "a", "b")
+            created: set[str] = set()
+            ensure_directory(directory, created)
+            assert os.path.isdir(directory)
+            assert created == {directory}
+
+            with patch("beancount_importers.cli.telegram_downloader.Path") as mock:
+                ensure_directory(directory, created)
+                mock.assert_not_called()
+
+
+class TestFindLastMessageId:
+    """Tests for finding the last saved message ID."""
+
+    HEADER = (
+        "id;sender;message_date;transaction_date;account;payee;description;"
+        "amount;currency;tag\r\n"
+    )
+
+    def write_csv(self, filename: Path, *rows: str) -> None:
+        """Write a downloader CSV file with the given rows."""
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        with open(filename, "w", encoding="utf-8", newline="") as f:
+            f.write(self.HEADER)
+            for row in rows:
+                f.write(row + "\r\n")
+
+    def test_read_last_row(self) -> None:
+        """Test reading the ID of the last row."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = Path(temp_dir) / "out.csv"
+            self.write_csv(
+                filename,
+                "7;A;2024-01-01;2024-01-01;Cash;Store;Food;1.00;CHF;",
+                "9;A;2024-01-02;2024-01-02;Cash;Store;Food;2.00;CHF;",
+            )
+            assert read_last_message_id(str(filename)) == 9
+
+    def test_read_header_only(self) -> None:
+        """Test reading a file without rows."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = Path(temp_dir) / "out.csv"
+            self.write_csv(filename)
+            assert read_last_message_id(str(filename)) == 0
+
+    def test_read_multiline_last_row(self) -> None:
+        """Test falling back to a full scan if the last line is not a row."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = Path(temp_dir) / "out.csv"
+            self.write_csv(
+                filename,
+                '12;A;2024-01-01;2024-01-01;Cash;Store;"Food\nand drinks";1.00;CHF;',
+            )
+            assert read_last_message_id(str(filename)) == 12
+
+    def test_backdated_transaction(self) -> None:
+        """Test that all yearly files are considered."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            args = Namespace()
+            args.account_map = {"Cash": "Assets:Cash:CHF"}
+            args.root_folder = temp_dir
+            folder = Path(temp_dir) / "Assets" / "Cash" / "CHF"
+            self.write_csv(
+                folder / "2024-12-31-Cash_Transactions_TelegramBot.csv",
+                "5;A;2024-12-30;2024-12-30;Cash;Store;Food;1.00;CHF;",
+                "8;A;2025-01-02;2024-12-31;Cash;Store;Food;1.00;CHF;",
+            )
+            self.write_csv(
+                folder / "2025-12-31-Cash_Transactions_TelegramBot.csv",
+                "6;A;2025-01-01;2025-01-01;Cash;Store;Food;1.00;CHF;",
+            )
+            assert find_last_message_id(["Cash"], args) == 8
+
+    def test_no_files(self) -> None:
+        """Test an account without saved files."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            args = Namespace()
+            args.account_map = {"Cash": "Assets:Cash:CHF"}
+            args.root_folder = temp_dir
+            assert find_last_message_id(["Cash"], args) == 0
+
+    def test_shared_folder(self) -> None:
+        """Test accounts sharing a folder, which is listed only once."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            args = Namespace()
+            args.account_map = {"Cash": "Assets:Cash", "Card": "Assets:Cash"}
+            args.root_folder = temp_dir
+            folder = Path(temp_dir) / "Assets" / "Cash"
+            self.write_csv(
+                folder / "2024-12-31-Cash_Transactions_TelegramBot.csv",
+                "5;A;2024-12-30;2024-12-30;Cash;Store;Food;1.00;CHF;",
+            )
+            self.write_csv(
+                folder / "2024-12-31-Card_Transactions_TelegramBot.csv",
+                "9;A;2024-12-30;2024-12-30;Card;Store;Food;1.00;CHF;",
+            )
+            self.write_csv(
+                folder / "2024-12-31-Other_Transactions_TelegramBot.csv",
+                "20;A;2024-12-30;2024-12-30;Other;Store;Food;1.00;CHF;",
+            )
+            with patch(
+                "beancount_importers.cli.telegram_downloader.scandir",
+                wraps=os.scandir,
+            ) as mock_scandir:
+                assert find_last_message_id(["Cash", "Card"], args) == 9
+            mock_scandir.assert_called_once()
+            assert find_last_message_id(["Cash"], args) == 5
+
+
 class TestCheckConnection:
     """Tests for check_connection function."""
 
@@ -242,6 +596,18 @@ class TestCheckConnection:
         mock_client.get_entity.assert_called_once_with(67890)
         mock_client.iter_messages.assert_called_once_with(67890, reverse=False, limit=1)
 
+    @patch("beancount_importers.cli.telegram_downloader.TelegramClient")
+    def test_check_connection_with_client(self, mock_client_class: MagicMock) -> None:
+        """Test that a given client is used instead of creating a new one."""
+        mock_client = MagicMock()
+        mock_client.iter_messages.return_value = []
+
+        args = Namespace(chat_id=67890)
+        check_connection(args, mock_client)
+
+        mock_client_class.assert_not_called()
+        mock_client.get_entity.assert_called_once_with(67890)
+
 
 class TestTelegramDownloaderMain:
     """Tests for the main beancount_telegram function."""
@@ -333,6 +699,174 @@ class TestTelegramDownloaderMain:
             assert rows[0]["amount"] == "50.00"
             assert rows[0]["currency"] == "CHF"
 
+    @patch("beancount_importers.cli.telegram_downloader.TelegramClient")
+    def test_missing_account_map(
+        self,
+        mock_client_class: MagicMock,
+        mock_args: Namespace,
+    ) -> None:
+        """Test invalid arguments fail before the Telegram session is opened."""
+        from argparse import ArgumentError
+
+        from beancount_importers.cli.telegram_downloader import beancount_telegram
+
+        mock_args.account_map = None
+        with patch(
+            "beancount_importers.cli.telegram_downloader.ArgumentParser"
+        ) as mock_parser_class:
+            mock_parser = MagicMock()
+            mock_parser_class.return_value = mock_parser
+            mock_parser.parse_args.return_value = mock_args
+
+            with pytest.raises(ArgumentError):
+                beancount_telegram()
+
+        mock_client_class.assert_not_called()
+
+    @patch("beancount_importers.cli.telegram_downloader.check_connection")
+    @patch("beancount_importers.cli.telegram_downloader.TelegramClient")
+    def test_check_uses_client(
+        self,
+        mock_client_class: MagicMock,
+        mock_check_connection: MagicMock,
+        mock_args: Namespace,
+    ) -> None:
+        """Test that the connection check uses the client of the run."""
+        from beancount_importers.cli.telegram_downloader import beancount_telegram
+
+        mock_args.check = True
+        mock_args.account_map = None
+        with patch(
+            "beancount_importers.cli.telegram_downloader.ArgumentParser"
+        ) as mock_parser_class:
+            mock_parser = MagicMock()
+            mock_parser_class.return_value = mock_parser
+            mock_parser.parse_args.return_value = mock_args
+
+            beancount_telegram()
+
+        mock_client_class.assert_called_once_with(
+            mock_args.session_file, mock_args.api_id, mock_args.api_hash
+        )
+        mock_check_connection.assert_called_once_with(
+            mock_args, mock_client_class.return_value
+        )
+
+    @patch("beancount_importers.cli.telegram_downloader.TelegramClient")
+    def test_multiple_transactions(
+        self,
+        mock_client_class: MagicMock,
+        mock_args: Namespace,
+    ) -> None:
+        """Test parsing several messages into yearly files."""
+        from beancount_importers.cli.telegram_downloader import beancount_telegram
+
+        # Setup mock client
+        mock_client = MagicMock()
+        mock_client_class.return_value = mock_client
+
+        mock_sender = MagicMock()
+        mock_sender.first_name = "Test User"
+        texts = [
+            "2023-12-30;Cash;Store;Groceries;10.00 CHF",
+            "2024-01-15;Cash;Store;Groceries;20.00 CHF",
+            " 2024-01-16 ; Cash ; Store ; Groceries ; 30.00  CHF ",
+        ]
+        messages = []
+        for index, text in enumerate(texts, start=1):
+            mock_message = MagicMock()
+            mock_message.id = index
+            mock_message.sender = mock_sender
+            mock_message.date = datetime(2024, 1, 16)
+            mock_message.text = text
+            mock_message.document = None
+            messages.append(mock_message)
+        mock_client.iter_messages.return_value = messages
+
+        with patch(
+            "beancount_importers.cli.telegram_downloader.ArgumentParser"
+        ) as mock_parser_class:
+            mock_parser = MagicMock()
+            mock_parser_class.return_value = mock_parser
+            mock_parser.parse_args.return_value = mock_args
+
+            beancount_telegram()
+
+        folder = Path(mock_args.root_folder) / "Assets" / "Cash" / "CHF"
+        expected_ids = {"2023": ["1"], "2024": ["2", "3"]}
+        for year, ids in expected_ids.items():
+            csv_file = folder / f"{year}-12-31-Cash_Transactions_TelegramBot.csv"
+            with open(csv_file, encoding="utf-8") as f:
+                rows = list(csv.DictReader(f, delimiter=";"))
+            assert [row["id"] for row in rows] == ids
+            assert all(row["currency"] == "CHF" for row in rows)
+
+    @patch("beancount_importers.cli.telegram_downloader.TelegramClient")
+    def test_interrupted_download(
+        self,
+        mock_client_class: MagicMock,
+        mock_args: Namespace,
+    ) -> None:
+        """Test that queued attachments are downloaded when the run fails."""
+        from beancount_importers.cli.telegram_downloader import beancount_telegram
+
+        # Setup mock client with a real event loop
+        mock_client = MagicMock()
+        mock_client_class.return_value = mock_client
+        mock_client.loop = asyncio.new_event_loop()
+        downloaded = []
+
+        async def download_media(message: Any, file: str) -> str:
+            downloaded.append((message.id, file))
+            return file
+
+        mock_client.download_media = download_media
+
+        # Attachment, then transaction, then a connection failure
+        attachment = MagicMock()
+        attachment.id = 10
+        attachment.date = datetime(2024, 1, 15)
+        attachment.text = None
+        attachment.document.attributes[0].file_name = "receipt.pdf"
+        transaction = MagicMock()
+        transaction.id = 11
+        transaction.sender.first_name = "Test User"
+        transaction.date = datetime(2024, 1, 15)
+        transaction.text = "2024-01-15;Cash;Store;Groceries;50.00 CHF"
+        transaction.document = None
+
+        def iter_messages(*args: Any, **kwargs: Any) -> Generator[Any, None, None]:
+            yield attachment
+            yield transaction
+            raise ConnectionError
+
+        mock_client.iter_messages = iter_messages
+        mock_args.no_download = False
+
+        try:
+            with (
+                patch(
+                    "beancount_importers.cli.telegram_downloader.ArgumentParser"
+                ) as mock_parser_class,
+                patch("builtins.print"),
+            ):
+                mock_parser = MagicMock()
+                mock_parser_class.return_value = mock_parser
+                mock_parser.parse_args.return_value = mock_args
+
+                with pytest.raises(ConnectionError):
+                    beancount_telegram()
+        finally:
+            mock_client.loop.close()
+
+        # The transaction was written, so the attachment must have been downloaded
+        assert downloaded == [(10, f"{mock_args.temp_folder}/receipt.pdf")]
+        folder = Path(mock_args.root_folder) / "Assets" / "Cash" / "CHF"
+        csv_file = folder / "2024-12-31-Cash_Transactions_TelegramBot.csv"
+        with open(csv_file, encoding="utf-8") as f:
+            rows = list(csv.DictReader(f, delimiter=";"))
+        assert [row["id"] for row in rows] == ["11"]
+
     @patch("beancount_importers.cli.telegram_downloader.TelegramClient")
     def test_dry_run_mode(
         self,
@@ -371,6 +905,23 @@ class TestTelegramDownloaderMain:
                 # Verify dry-run printed output
                 assert mock_print.called
 
+        # Entries are printed as dicts
+        expected_file = Path(mock_args.root_folder) / "Assets" / "Cash" / "CHF"
+        expected_file = expected_file / "2024-12-31-Cash_Transactions_TelegramBot.csv"
+        expected_entry = {
+            "id": "1",
+            "sender": "Test User",
+            "message_date": "2024-01-15",
+            "transaction_date": "2024-01-15",
+            "account": "Cash",
+            "payee": "Store",
+            "description": "Groceries",
+            "amount": "50.00",
+            "currency": "CHF",
+            "tag": "food",
+        }
+        mock_print.assert_any_call(f"{expected_file}: {expected_entry}")
+
     @patch("beancount_importers.cli.telegram_downloader.TelegramClient")
     def test_invalid_account(
         self,
@@ -408,6 +959,47 @@ class TestTelegramDownloaderMain:
                 print_calls = [str(call) for call in mock_print.call_args_list]
                 assert any("Invalid account" in str(call) for call in print_calls)
 
+    @patch("beancount_importers.cli.telegram_downloader.TelegramClient")
+    def test_plain_caption_skips_date_parser(
+        self,
+        mock_client_class: MagicMock,
+        mock_args: Namespace,
+    ) -> None:
+        """Test that messages without enough fields are not date-parsed."""
+        from beancount_importers.cli.telegram_downloader import beancount_telegram
+
+        # Setup mock client
+        mock_client = MagicMock()
+        mock_client_class.return_value = mock_client
+
+        mock_message = MagicMock()
+        mock_message.id = 1
+        mock_message.sender.first_name = "Test User"
+        mock_message.date = datetime(2024, 1, 15)
+        mock_message.text = "Receipt from the store"
+        mock_message.document = None
+
+        mock_client.iter_messages.return_value = [mock_message]
+
+        with (
+            patch(
+                "beancount_importers.cli.telegram_downloader.ArgumentParser"
+            ) as mock_parser_class,
+            patch(
+                "beancount_importers.cli.telegram_downloader.parse_transaction_date"
+            ) as mock_parse,
+            patch("builtins.print") as mock_print,
+        ):
+            mock_parser = MagicMock()
+            mock_parser_class.return_value = mock_parser
+            mock_parser.parse_args.return_value = mock_args
+
+            beancount_telegram()
+
+        mock_parse.assert_not_called()
+        print_calls = [str(call) for call in mock_print.call_args_list]
+        assert any("Invalid message" in call for call in print_calls)
+
     @patch("beancount_importers.cli.telegram_downloader.TelegramClient")
     def test_find_last_message_id(
         self,
@@ -57,6 +57,16 @@ class TestFinPensionImporter:
         assert importer.identify("other_bank.csv") is False
         assert importer.identify("FinPension.txt") is False
 
+    def test_identify_with_filememo_object(self, importer: Importer) -> None:
+        """Test file identification with _FileMemo-like objects."""
+
+        class MockFileMemo:
+            def __init__(self, name: str):
+                self.name = name
+
+        assert importer.identify(MockFileMemo("FinPension_Transactions.csv")) is True
+        assert importer.identify(MockFileMemo("other_bank.csv")) is False
+
     def test_name(self, importer: Importer) -> None:
         """Test importer name."""
         assert "Assets:FinPension:P5" in importer.name()
@@ -387,3 +397,102 @@ class TestFinPensionImporter:
                 importer.extract(temp_file, [])
         finally:
             os.unlink(temp_file)
+
+    def test_extract_non_iso_date(self, importer: Importer) -> None:
+        """Test extraction with a date that is not in ISO format."""
+        with tempfile.NamedTemporaryFile(
+            mode="w", suffix=".csv", delete=False, encoding="utf-8"
+        ) as f:
+            f.write(
+                'Date;Category;"Asset Name";ISIN;"Number of Shares";'
+                '"Asset Currency";"Currency Rate";"Asset Price in CHF";'
+                '"Cash Flow";Balance\n'
+            )
+            f.write("13 Jan 2023;Deposit;;;;CHF;1.0000000000;;588.000000;588.000000\n")
+            temp_file = f.name
+
+        try:
+            entries = importer.extract(temp_file, [])
+            assert len(entries) == 1
+            assert entries[0].date == date(2023, 1, 13)
+        finally:
+            os.unlink(temp_file)
+
+    def test_extract_missing_shares(self, importer: Importer) -> None:
+        """Test extraction with a buy transaction without number of shares."""
+        with tempfile.NamedTemporaryFile(
+            mode="w", suffix=".csv", delete=False, encoding="utf-8"
+        ) as f:
+            f.write(
+                'Date;Category;"Asset Name";ISIN;"Number of Shares";'
+                '"Asset Currency";"Currency Rate";"Asset Price in CHF";'
+                '"Cash Flow";Balance\n'
+            )
+            f.write(
+                '2023-01-15;Buy;"Test Fund CHF";CH0012345678;;CHF;1.0000000000;'
+                "100.000000;-500.000000;500.000000\n"
+            )
+            temp_file = f.name
+
+        try:
+            with pytest.raises(ValueError, match="Error parsing line 2"):
+                importer.extract(temp_file, [])
+        finally:
+            os.unlink(temp_file)
+
+    def test_extract_reordered_columns(self, importer: Importer) -> None:
+        """Test that columns are found by their header name."""
+        with tempfile.NamedTemporaryFile(
+            mode="w", suffix=".csv", delete=False, encoding="utf-8"
+        ) as f:
+            f.write(
+                '"Cash Flow";Category;Date;ISIN;"Asset Name";"Number of Shares";'
+                "Comment\n"
+            )
+            f.write('-500.000000;Buy;2023-01-15;CH0012345678;"Test Fund";5.000000;\n')
+            temp_file = f.name
+
+        try:
+            entries = importer.extract(temp_file, [])
+            assert len(entries) == 1
+            assert entries[0].date == date(2023, 1, 15)
+            assert entries[0].postings[-1].units == amount.Amount(
+                D("5.000000"), "TestFundCHF"
+            )
+        finally:
+            os.unlink(temp_file)
+
+    def test_extract_missing_column(self, importer: Importer) -> None:
+        """Test that a header without a required column is rejected."""
+        with tempfile.NamedTemporaryFile(
+            mode="w", suffix=".csv", delete=False, encoding="utf-8"
+        ) as f:
+            f.write('Date;Category;"Asset Name";ISIN;"Number of Shares";Balance\n')
+            f.write("2023-01-13;Deposit;;;;588.000000\n")
+            temp_file = f.name
+
+        try:
+            with pytest.raises(ValueError, match="Unexpected header"):
+                importer.extract(temp_file, [])
+        finally:
+            os.unlink(temp_file)
+
+    def test_extract_short_row(self, importer: Importer) -> None:
+        """Test that a row with missing columns reports its line number."""
+        with tempfile.NamedTemporaryFile(
+            mode="w", suffix=".csv", delete=False, encoding="utf-8"
+        ) as f:
+            f.write(
+                'Date;Category;"Asset Name";ISIN;"Number of Shares";'
+                '"Asset Currency";"Currency Rate";"Asset Price in CHF";'
+                '"Cash Flow";Balance\n'
+            )
+            f.write("2023-01-13;Deposit;;;;588.000000;588.000000\n")
+            f.write("2023-01-14;Deposit\n")
+            temp_file = f.name
+
+        try:
+            with pytest.raises(ValueError, match="Error parsing line 2"):
+                importer.extract(temp_file, [])
+        finally:
+            os.unlink(temp_file)
@@ -48,6 +48,16 @@ class TestIBKRImporter:
         assert importer.identify("2024-12-31-IBKR_Transactions.csv") is True
         assert importer.identify("other_file.txt") is False
 
+    def test_identify_with_filememo_object(self, importer: Importer) -> None:
+        """Test that the importer identifies _FileMemo-like objects."""
+
+        class MockFileMemo:
+            def __init__(self, filepath: str):
+                self.filepath = filepath
+
+        assert importer.identify(MockFileMemo("IBKR_Sample.csv")) is True
+        assert importer.identify(MockFileMemo("other_file.txt")) is False
+
     def test_name(self, importer: Importer) -> None:
         """Test that the importer name is correct."""
         name = importer.name()
@@ -474,6 +484,21 @@ class TestIBKRImporter:
         finally:
             os.unlink(temp_path)
 
+    def test_extract_short_row(self, importer: Importer) -> None:
+        """Test that extract warns about rows with missing columns."""
+        with tempfile.NamedTemporaryFile(
+            mode="w", suffix=".csv", delete=False, encoding="utf-8"
+        ) as f:
+            f.write('"10000000001","2024-01-03","BUY","USD","-563.10"\n')
+            temp_path = f.name
+
+        try:
+            with pytest.warns(UserWarning, match="Error parsing row 1"):
+                entries = importer.extract(temp_path)
+            assert entries == []
+        finally:
+            os.unlink(temp_path)
+
     def test_buy_transaction_postings(
         self, importer: Importer, sample_csv_file: str
     ) -> None:
@@ -327,6 +327,31 @@ class TestMintosImporter:
         finally:
             os.unlink(temp_file)
 
+    def test_extract_non_iso_date(self, importer: Importer) -> None:
+        """Test extraction with a date that is not in ISO format."""
+        with tempfile.NamedTemporaryFile(
+            mode="w", suffix=".csv", delete=False, encoding="utf-8"
+        ) as f:
+            f.write(
+                "TransactionID,DateInput,Details,Turnover,Balance,Date,Value,Type,Note\n"
+            )
+            f.write(
+                "1,2024-01-16,deposits,500.00,500.00,Jan 16 2024,500.00,Deposit,Test\n"
+            )
+            temp_file = f.name
+
+        try:
+            entries = importer.extract(temp_file, [])
+            deposits = [
+                entry
+                for entry in entries
+                if isinstance(entry, data.Transaction) and entry.narration == "Deposit"
+            ]
+            assert len(deposits) == 1
+            assert deposits[0].date == date(2024, 1, 16)
+        finally:
+            os.unlink(temp_file)
+
     def test_build_postings(self, importer: Importer) -> None:
         """Test build_postings method directly."""
         postings = importer.build_postings(D("5.00"), D("10.00"), D("-50.00"))
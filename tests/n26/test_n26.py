@@ -472,6 +472,25 @@ class TestN26ImporterSimple:
         finally:
             os.unlink(temp_file)
 
+    def test_extract_non_iso_date(self, importer: n26_importer) -> None:
+        """Test extraction with a date that is not in ISO format."""
+        with tempfile.NamedTemporaryFile(
+            mode="w", suffix=".csv", delete=False, encoding="utf-8"
+        ) as f:
+            f.write(n26_importer.CSV_HEADER)
+            f.write(
+                'Jan 16 2024,2024-01-16,"STARBUCKS",,Presentment,,"Main Account",'
+                "-4.50,4.50,EUR,1\n"
+            )
+            temp_file = f.name
+
+        try:
+            entries = importer.extract(temp_file, [])
+            assert len(entries) == 1
+            assert entries[0].date == date(2024, 1, 16)
+        finally:
+            os.unlink(temp_file)
+
 
 class TestN26ImporterIntegrationSimple:
     """Integration tests for the N26 importer with real CSV files."""
@@ -346,6 +346,28 @@ class TestNeonImporter:
         finally:
             os.unlink(temp_path)
 
+    def test_extract_non_iso_date(self, importer: Importer) -> None:
+        """Test extraction with a date that is not in ISO format."""
+        with tempfile.NamedTemporaryFile(
+            mode="w", suffix=".csv", delete=False, encoding="utf-8"
+        ) as f:
+            f.write(
+                '"Date";"Amount";"Original amount";"Original currency";'
+                '"Exchange rate";"Description";"Subject";"Category";"Tags";'
+                '"Wise";"Spaces"\n'
+            )
+            f.write(
+                '"Jan 16 2024";"-4.50";"";"";"";"Coffee Shop";"";"food";"";"no";"no"\n'
+            )
+            temp_path = f.name
+
+        try:
+            entries = importer.extract(temp_path)
+            assert len(entries) == 1
+            assert entries[0].date == date(2024, 1, 16)
+        finally:
+            os.unlink(temp_path)
+
     def test_extract_reversed_order(
         self, importer: Importer, sample_csv_file: str
     ) -> None:
@@ -0,0 +1,77 @@
+"""Tests for the importers package."""
+
+import subprocess
+import sys
+
+import pytest
+
+from beancount_importers import importers
+
+
+def run_python(code: str) -> str:
+    """Run code in a fresh interpreter and return its output."""
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return result.stdout.strip()
+
+
+class TestImporters:
+    """Tests for lazy loading of importers."""
+
+    def test_no_importer_loaded_on_import(self) -> None:
+        """Test that importing the package loads no importer module."""
+        output = run_python(
+            "import sys, beancount_importers\n"
+            "print(sorted(m for m in sys.modules"
+            " if m.startswith('beancount_importers.importers.') and '._' not in m))"
+        )
+        assert output == "[]"
+
+    def test_only_accessed_importer_loaded(self) -> None:
+        """Test that accessing an importer loads only its module."""
+        output = run_python(
+            "import sys\n"
+            "from beancount_importers.importers import n26_importer\n"
+            "print(sorted(m for m in sys.modules"
+            " if m.startswith('beancount_importers.importers.') and '._' not in m))"
+        )
+        assert output == "['beancount_importers.importers.n26']"
+
+    def test_exported_importers(self) -> None:
+        """Test that every exported name resolves to its importer class."""
+        from beancount_importers.importers.splitwise import TripSplitWiseImporter
+        from beancount_importers.importers.zkb import ZkbCSVImporter
+
+        assert importers.zkb_importer is ZkbCSVImporter
+        assert importers.splitwise_trip_importer is TripSplitWiseImporter
+        for name in importers.__all__:
+            assert isinstance(getattr(importers, name), type)
+        assert set(importers.__all__) <= set(dir(importers))
+
+    def test_unknown_attribute(self) -> None:
+        """Test that unknown names raise AttributeError."""
+        with pytest.raises(AttributeError):
+            importers.unknown_importer  # noqa: B018
+
+    def test_enabled_importers(self) -> None:
+        """Test restricting star imports through the environment."""
+        output = run_python(
+            "import os, sys\n"
+            "os.environ['BEANCOUNT_IMPORTERS_ENABLED'] = 'n26, certo_one_importer'\n"
+            "from beancount_importers.importers import *\n"
+            "from beancount_importers import importers\n"
+            "print(importers.__all__)\n"
+            "print(sorted(m for m in sys.modules"
+            " if m.startswith('beancount_importers.importers.') and '._' not in m))\n"
+            "print(importers.zkb_importer.__name__)"
+        )
+        assert output.splitlines() == [
+            "['certo_one_importer', 'n26_importer']",
+            "['beancount_importers.importers.certo_one', "
+            "'beancount_importers.importers.n26']",
+            "ZkbCSVImporter",
+        ]